@@ -17,6 +17,23 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 class Settings(BaseSettings):
     # Database - Neon PostgreSQL
     database_url: str
+    # Connection pool profile: "direct", "fixed" or "pgbouncer" (see app/database.py)
+    db_pool_profile: str = "direct"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Seconds to wait for a free pooled connection / to open a new one
+    db_pool_timeout: float = 30
+    db_connect_timeout: float = 10
+    # Per-statement timeout in seconds (asyncpg, 0 = none)
+    db_command_timeout: float = 0
+    # Replace pooled connections older than this many seconds (-1 = never)
+    db_pool_recycle: int = 1800
+    # asyncpg prepared statements cached per connection (forced to 0 by "pgbouncer")
+    db_statement_cache_size: int = 100
+    # Optional read replica for public catalog reads ("" = use the primary)
+    database_read_url: str = ""
+    # After a catalog write, this worker reads from the primary for this long
+    database_read_after_write_seconds: float = 5
     
     # Google Drive Folder URL
     google_drive_folder_url: str = "https://drive.google.com/drive/folders/1ms1u6tuw22Bsl1SsGpR1zXtkR_zsgddx"
@@ -24,6 +41,105 @@ class Settings(BaseSettings):
     # OpenRouter API (for AI descriptions)
     openrouter_api_key: str = ""
     
+    # Product image blob store (content-addressed by SHA-256)
+    image_store_backend: str = "local"
+    image_store_path: str = str(BASE_DIR / "data" / "images")
+    
+    # Shared upstream HTTP clients (Drive, OpenRouter)
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = True
+    
+    # Google Drive image proxy cache (memory LRU + disk)
+    image_cache_memory_bytes: int = 32 * 1024 * 1024
+    image_cache_dir: str = str(BASE_DIR / "data" / "image-cache")
+    image_cache_disk_bytes: int = 512 * 1024 * 1024
+    
+    # Largest upstream image the proxy will pass through
+    image_proxy_max_bytes: int = 25 * 1024 * 1024
+    
+    # Largest image upload accepted by the AI product endpoints (413 above this)
+    max_upload_bytes: int = 10 * 1024 * 1024
+    
+    # Largest bulk product import body (JSON / NDJSON / CSV)
+    max_import_bytes: int = 20 * 1024 * 1024
+    
+    # Start the next Drive URL variant if the current one is this slow (0 = race all)
+    image_proxy_hedge_delay: float = 0.75
+    
+    # Resized image variants (requires Pillow)
+    image_worker_processes: int = 2
+    image_variant_quality: int = 80
+    image_variant_cache_memory_bytes: int = 16 * 1024 * 1024
+    image_variant_cache_dir: str = str(BASE_DIR / "data" / "image-variants")
+    image_variant_cache_disk_bytes: int = 256 * 1024 * 1024
+    
+    # Models tried per AI request before giving up (failover across free models)
+    llm_failover_attempts: int = 3
+    
+    # Background AI description jobs
+    ai_job_workers: int = 4
+    ai_provider_concurrency: int = 2
+    # How often each process looks for queued / stale jobs in the table (0 = only at startup)
+    ai_job_poll_seconds: float = 30
+    
+    # Persistent cache of AI descriptions (0 TTL disables)
+    llm_cache_ttl_seconds: int = 30 * 24 * 3600
+    llm_cache_max_entries: int = 10000
+    
+    # Images sent to the vision model are fitted within this size and re-encoded as JPEG
+    vision_image_max_side: int = 1024
+    vision_image_quality: int = 85
+    
+    # In-process catalog read cache
+    catalog_cache_ttl_seconds: float = 60
+    catalog_cache_max_entries: int = 512
+    
+    # Public base URL of this API, prefixed to image blob URLs ("" = relative)
+    public_api_url: str = ""
+    
+    # Admin sessions: "memory" (single process), "database" (shared by all
+    # workers) or "signed" (stateless HMAC-signed tokens)
+    session_backend: str = "memory"
+    session_max_sessions: int = 10000
+    # How long a database-backed session lookup (or the signed-token
+    # revocation list) is reused by a worker. This is also how long a
+    # logout or an admin demotion made through one worker can take to
+    # reach the others: keep it short.
+    session_cache_seconds: float = 5
+    # HMAC key for signed tokens; must be the same on every worker
+    session_secret_key: str = ""
+    
+    # Admin password hashing ("scrypt" or "pbkdf2_sha256"); calibrate the
+    # cost with `python calibrate_password_hash.py`. Older hashes are
+    # upgraded on the next login.
+    password_hash_algorithm: str = "scrypt"
+    password_scrypt_n: int = 2 ** 14
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    password_pbkdf2_iterations: int = 600000
+    # Threads verifying passwords concurrently
+    password_hash_workers: int = 2
+    
+    # Token-bucket rate limits: "memory" (per process) or "database" (shared)
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 10000
+    # Scopes kept in per-process memory even with the database backend (comma-separated)
+    rate_limit_memory_scopes: str = "image-proxy"
+    # Reverse proxies in front of the app that append to X-Forwarded-For
+    # (0 = use the socket address)
+    trusted_proxy_count: int = 0
+    # Requests per minute and burst per bucket (0 per minute disables)
+    login_ip_rate_per_minute: float = 10
+    login_ip_burst: int = 20
+    login_email_rate_per_minute: float = 5
+    login_email_burst: int = 5
+    ai_rate_per_minute: float = 10
+    ai_burst: int = 20
+    image_proxy_rate_per_minute: float = 600
+    image_proxy_burst: int = 300
+    
     # CORS - Support multiple origins for production
     cors_origins: str = "http://localhost:3000"
     
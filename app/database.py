@@ -2,23 +2,128 @@
 Database Configuration
 ======================
 SQLAlchemy async setup for Neon PostgreSQL
+
+Connection pooling follows DB_POOL_PROFILE:
+- direct: QueuePool of pool_size + max_overflow, pinging each connection
+  on checkout (safe default for Neon's direct endpoint, whose idle
+  connections can be dropped while the compute is suspended).
+- fixed: exactly pool_size connections, no pre-ping round trip; stale
+  connections are avoided by recycling them after pool_recycle seconds.
+- pgbouncer: no app-side pool (NullPool) for Neon's -pooler endpoint /
+  PgBouncer in transaction mode; asyncpg's prepared statement caches are
+  disabled and statement names made unique, since consecutive
+  transactions may run on different server connections.
+
+With DATABASE_READ_URL set (e.g. a Neon read replica), public catalog
+reads go through get_read_db() to a second engine. For a few seconds
+after this worker writes catalog data, reads stay on the primary so
+admins see their own changes despite replica lag.
 """
 
+import time
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
 from app.config import settings
 
+DB_POOL_PROFILES = ("direct", "fixed", "pgbouncer")
+
 # Base class for models (must be defined before imports)
 Base = declarative_base()
 
-# Create async engine with PostgreSQL optimized settings
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.environment == "development",
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+
+def engine_options(url: str) -> dict:
+    """create_async_engine() keyword arguments for the configured pool profile"""
+    profile = settings.db_pool_profile
+    if profile not in DB_POOL_PROFILES:
+        raise ValueError(f"Unknown database pool profile: {profile}")
+    
+    options = {"echo": settings.environment == "development"}
+    connect_args = {}
+    is_asyncpg = make_url(url).get_driver_name() == "asyncpg"
+    if is_asyncpg:
+        connect_args["timeout"] = settings.db_connect_timeout
+        if settings.db_command_timeout > 0:
+            connect_args["command_timeout"] = settings.db_command_timeout
+    
+    if profile == "pgbouncer":
+        options["poolclass"] = NullPool
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow if profile == "direct" else 0,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=profile == "direct",
+        )
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = settings.db_statement_cache_size
+            connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+    
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+class PoolCounters:
+    """Connection lifecycle counters for one engine (fed by pool events)"""
+    
+    def __init__(self, async_engine):
+        self.engine = async_engine
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        pool_events = async_engine.sync_engine.pool
+        event.listen(pool_events, "connect", self._on_connect)
+        event.listen(pool_events, "checkout", self._on_checkout)
+        event.listen(pool_events, "invalidate", self._on_invalidate)
+    
+    def _on_connect(self, *args) -> None:
+        self.connects += 1
+    
+    def _on_checkout(self, *args) -> None:
+        self.checkouts += 1
+    
+    def _on_invalidate(self, *args) -> None:
+        self.invalidations += 1
+    
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        stats = {
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+        }
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                size=pool.size(),
+                checkedIn=pool.checkedin(),
+                checkedOut=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+# Create async engine with the configured pool profile
+engine = create_async_engine(settings.database_url, **engine_options(settings.database_url))
+pool_counters = PoolCounters(engine)
+
+# Optional read-only engine for public reads (falls back to the primary)
+if settings.database_read_url:
+    read_engine = create_async_engine(settings.database_read_url, **engine_options(settings.database_read_url))
+    read_pool_counters = PoolCounters(read_engine)
+else:
+    read_engine = engine
+    read_pool_counters = None
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -29,6 +134,32 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# Monotonic time of this worker's last catalog write (see mark_primary_write)
+_last_primary_write = float("-inf")
+
+
+def mark_primary_write() -> None:
+    """Record a catalog write so the following reads see it (read-your-writes)"""
+    global _last_primary_write
+    _last_primary_write = time.monotonic()
+
+
+def read_sessionmaker() -> async_sessionmaker:
+    """Session factory for public reads: the replica, unless a write just happened"""
+    if read_engine is engine:
+        return AsyncSessionLocal
+    if time.monotonic() - _last_primary_write < settings.database_read_after_write_seconds:
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal
+
 
 async def get_db() -> AsyncSession:
     """Dependency for getting async database session"""
@@ -39,10 +170,30 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """Dependency for read-only public queries (read replica when configured)"""
+    async with read_sessionmaker()() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def pool_stats() -> dict:
+    """Live pool usage for this worker"""
+    stats = {
+        "profile": settings.db_pool_profile,
+        "primary": pool_counters.stats(),
+    }
+    if read_pool_counters is not None:
+        stats["replica"] = read_pool_counters.stats()
+    return stats
+
+
 async def init_db():
     """Initialize database tables"""
     # Import models to register them with Base
-    from app.models import Admin, Category, Product, SiteSettings
+    from app.models import Admin, AdminSession, AIJob, Category, LLMCacheEntry, Product, RateLimitBucket, RevokedToken, SignedAdminUpdate, SiteSettings
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -5,12 +5,18 @@ Mohana Textiles E-commerce Backend
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from app.config import settings
-from app.database import init_db
+from app.database import engine, init_db, pool_stats, read_engine
+from app.services.auth import get_current_admin
+from app.services.ai_jobs import ai_job_queue
+from app.services.http_clients import start_http_clients, close_http_clients
+from app.services.image_variants import shutdown_image_workers
+from app.services.passwords import warm_up as warm_up_password_hashing
+from app.services.uploads import UploadLimitMiddleware
 from app.routers import (
     auth_router,
     products_router,
@@ -37,10 +43,25 @@ async def lifespan(app: FastAPI):
     # Initialize database
     await init_db()
     logger.info("Database initialized successfully")
+    
+    # Shared upstream HTTP clients (keep-alive pools)
+    await start_http_clients()
+    
+    # Background AI description workers
+    await ai_job_queue.start()
+    
+    # Login timing must not depend on whether an unknown email was tried before
+    await warm_up_password_hashing()
     logger.info("Server ready")
     
     yield
     
+    await ai_job_queue.stop()
+    await close_http_clients()
+    shutdown_image_workers()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     logger.info("Server shutdown complete")
 
 
@@ -52,6 +73,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Reject oversized uploads before their body is read (inside CORS so errors are readable)
+app.add_middleware(UploadLimitMiddleware, max_bytes=settings.max_upload_bytes)
+
 # CORS - Configure based on environment
 if settings.is_production:
     # Production: Strict CORS
@@ -92,3 +116,9 @@ async def root():
 async def health():
     """API health check"""
     return {"status": "ok"}
+
+
+@app.get("/api/health/db-pool")
+async def db_pool_health(_: dict = Depends(get_current_admin)):
+    """Database connection pool usage for this worker (admin only)"""
+    return pool_stats()
@@ -3,5 +3,9 @@ from app.models.product import Product, ColorVariant
 from app.models.category import Category
 from app.models.admin import Admin
 from app.models.settings import SiteSettings
+from app.models.ai_job import AIJob
+from app.models.llm_cache import LLMCacheEntry
+from app.models.session import AdminSession, RevokedToken, SignedAdminUpdate
+from app.models.rate_limit import RateLimitBucket
 
-__all__ = ["Product", "ColorVariant", "Category", "Admin", "SiteSettings"]
+__all__ = ["Product", "ColorVariant", "Category", "Admin", "SiteSettings", "AIJob", "LLMCacheEntry", "AdminSession", "RevokedToken", "SignedAdminUpdate", "RateLimitBucket"]
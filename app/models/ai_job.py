@@ -0,0 +1,41 @@
+"""
+AI Job Model
+============
+Database model for background AI description jobs
+"""
+
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.sql import func
+import uuid
+from app.database import Base
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(32), nullable=False, default="description")
+    product_id = Column(String(36), index=True)
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    model = Column(String(100), default="")
+    result = Column(Text, default="")
+    error = Column(Text, default="")
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "productId": self.product_id,
+            "status": self.status,
+            "model": self.model or "",
+            "result": self.result or "",
+            "error": self.error or "",
+            "attempts": self.attempts or 0,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,20 @@
+"""
+LLM Cache Model
+===============
+Database model for cached AI-generated descriptions
+"""
+
+from sqlalchemy import Column, String, Integer, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_description_cache"
+    
+    key = Column(String(64), primary_key=True)  # SHA-256 of (image hash, name, category, model, prompt version)
+    description = Column(Text, nullable=False)
+    model = Column(String(100), default="")
+    prompt_version = Column(Integer, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -8,9 +8,31 @@ from sqlalchemy import Column, String, Float, Boolean, Integer, Text, DateTime,
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+from urllib.parse import quote
+from app.config import settings
 from app.database import Base
 
 
+def product_image_url(image_key: str, image_data: str) -> str:
+    """Public image URL: blob endpoint for stored images, else the stored value"""
+    if image_key:
+        return f"{settings.public_api_url}/api/images/blob/{image_key}"
+    return image_data or ""
+
+
+# Width of the resized variant used for grid tiles
+THUMBNAIL_WIDTH = 400
+
+
+def product_thumbnail_url(image_key: str, image_data: str) -> str:
+    """Resized image URL for grid tiles (stored blobs and proxied Drive URLs)"""
+    if image_key:
+        return f"{product_image_url(image_key, image_data)}?w={THUMBNAIL_WIDTH}"
+    if image_data and image_data.startswith("http"):
+        return f"{settings.public_api_url}/api/images/proxy?url={quote(image_data, safe='')}&w={THUMBNAIL_WIDTH}"
+    return image_data or ""
+
+
 class Product(Base):
     __tablename__ = "products"
     
@@ -21,7 +43,8 @@ class Product(Base):
     discount = Column(Float, default=0)
     final_price = Column(Float, nullable=False)
     description = Column(Text, default="")
-    image_data = Column(Text, default="")  # Store base64 encoded image
+    image_data = Column(Text, default="")  # External image URL (legacy rows: base64 data URL)
+    image_key = Column(String(64), default="")  # SHA-256 key into the image blob store
     enabled = Column(Boolean, default=True, index=True)
     sizes = Column(JSON, default=list)  # Store as JSON array
     colors = Column(JSON, default=list)  # Store as JSON array of {name, hex}
@@ -37,7 +60,8 @@ class Product(Base):
             "discount": self.discount,
             "finalPrice": self.final_price,
             "description": self.description,
-            "imageData": self.image_data,
+            "imageData": product_image_url(self.image_key, self.image_data),
+            "imageKey": self.image_key or "",
             "enabled": self.enabled,
             "sizes": self.sizes or [],
             "colors": self.colors or [],
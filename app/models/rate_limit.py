@@ -0,0 +1,17 @@
+"""
+Rate Limit Model
+================
+Database model for token buckets (database rate limit backend)
+"""
+
+from sqlalchemy import Column, String, Float, Boolean
+from app.database import Base
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(64), primary_key=True)  # SHA-256 of "<scope>:<identity>"
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)  # Unix time of the last request
+    allowed = Column(Boolean, nullable=False, default=True)  # Outcome of the last request
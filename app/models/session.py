@@ -0,0 +1,39 @@
+"""
+Session Model
+=============
+Database models for admin login sessions (database session backend)
+and revoked signed tokens / admin changes (signed session backend)
+"""
+
+from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class AdminSession(Base):
+    __tablename__ = "admin_sessions"
+    
+    token_hash = Column(String(64), primary_key=True)  # SHA-256 of the bearer token
+    admin_id = Column(String(36), nullable=False, index=True)
+    email = Column(String(255), nullable=False)
+    display_name = Column(String(100), default="")  # Admin snapshot at login, refreshed on change
+    is_admin = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(32), primary_key=True)  # Token ID of a logged-out signed token
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class SignedAdminUpdate(Base):
+    __tablename__ = "signed_admin_updates"
+    
+    admin_id = Column(String(36), primary_key=True)
+    display_name = Column(String(100), default="")  # Snapshot that replaces the one signed into older tokens
+    is_admin = Column(Boolean, default=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Tokens issued at or before this are refreshed
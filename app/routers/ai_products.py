@@ -4,23 +4,40 @@ AI Product Router
 Endpoints for creating products with AI-generated descriptions
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-import base64
+import httpx
 from typing import List, Optional
 import json
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, AsyncSessionLocal
+from app.schemas.ai_job import AIJobResponse, AIJobBatchResponse
+from app.schemas.product import ProductBulkSelection
+from app.services.ai_jobs import AIJobService, ProductImageMissing, ai_job_queue
 from app.services.auth import AuthService, get_current_admin
 from app.services.llm import LLMService
+from app.services.llm_cache import llm_cache
+from app.services.http_clients import get_openrouter_client
+from app.services.image_store import get_image_store
+from app.services.uploads import UploadTooLarge, spool_upload
+from app.services.image_variants import ImageVariantService
+from app.services.product import ProductService, bulk_filter
+from app.services.rate_limit import rate_limit
+from app.services.streaming import sse_response
 from app.models.product import Product
 
 
 router = APIRouter(prefix="/api/ai-products", tags=["AI Products"])
 
+# Endpoints that call the model spend free-tier quota, so they are throttled per client
+AI_RATE_LIMIT = [Depends(rate_limit("ai", settings.ai_rate_per_minute, settings.ai_burst))]
 
-@router.post("/create-with-ai")
+
+@router.post("/create-with-ai", dependencies=AI_RATE_LIMIT)
 async def create_product_with_ai(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     category: str = Form(...),
     price: float = Form(...),
@@ -30,30 +47,43 @@ async def create_product_with_ai(
     image: UploadFile = File(...),
     generate_description: bool = Form(True),
     custom_description: Optional[str] = Form(None),
+    background_description: bool = Form(False),
     db: AsyncSession = Depends(get_db),
+    llm_client: httpx.AsyncClient = Depends(get_openrouter_client),
     current_user = Depends(get_current_admin)
 ):
     """
-    Create a product with AI-generated description from image
+    Create a product with AI-generated description from image.
+    With `background_description`, the product is created right away and
+    the description is generated by a queued job (see `jobId`).
     """
     try:
-        # Read and encode image
-        image_bytes = await image.read()
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
+        upload = await spool_upload(image)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
         # Generate description using AI if requested
         description = custom_description or ""
-        if generate_description:
+        ai_description = ""
+        if generate_description and not background_description:
+            image_base64, image_mime = await ImageVariantService.encode_for_vision(await upload.read_bytes())
             ai_description, error = await LLMService.generate_description(
                 image_base64=image_base64,
+                image_mime=image_mime,
                 product_name=name,
-                category=category
+                category=category,
+                client=llm_client,
+                image_hash=upload.sha256
             )
             if ai_description:
                 description = ai_description
             elif not custom_description:
                 # Fallback if AI fails and no custom description
                 description = f"High-quality {category} - {name}"
+        elif generate_description and not description:
+            # Placeholder until the queued job writes the AI description
+            description = f"High-quality {category} - {name}"
         
         # Parse sizes and colors
         sizes_list = json.loads(sizes) if sizes else []
@@ -62,6 +92,9 @@ async def create_product_with_ai(
         # Calculate final price
         final_price = price * (1 - discount / 100)
         
+        # Store the spooled upload in the blob store under the hash computed while reading it
+        image_key = await get_image_store().put_file(upload.file, upload.sha256)
+        
         # Create product
         product = Product(
             name=name,
@@ -70,20 +103,35 @@ async def create_product_with_ai(
             discount=discount,
             final_price=final_price,
             description=description,
-            image_data=f"data:image/{image.content_type.split('/')[-1]};base64,{image_base64}",
+            image_data="",
+            image_key=image_key,
             sizes=sizes_list,
             colors=colors_list,
             enabled=True
         )
         
         db.add(product)
+        await db.flush()
+        # Queue the description job in the same transaction, so the product
+        # is never committed without it
+        job_ids = []
+        if generate_description and background_description:
+            job_ids = await AIJobService.add_description_jobs(db, [product.id])
         await db.commit()
         await db.refresh(product)
+        ProductService.invalidate_cache(product.id, [product.category])
+        ai_job_queue.submit(job_ids)
+        
+        # Render thumbnail / grid variants after the response is sent
+        background_tasks.add_task(ImageVariantService.pregenerate, image_key)
+        
+        job_id = job_ids[0] if job_ids else None
         
         return {
             "success": True,
             "product": product.to_dict(),
-            "ai_generated": generate_description and ai_description != ""
+            "ai_generated": generate_description and ai_description != "",
+            "jobId": job_id,
         }
         
     except Exception as e:
@@ -91,26 +139,32 @@ async def create_product_with_ai(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/generate-description")
+@router.post("/generate-description", dependencies=AI_RATE_LIMIT)
 async def generate_description_from_image(
     image: UploadFile = File(...),
     product_name: str = Form(...),
-    category: str = Form(...)
+    category: str = Form(...),
+    llm_client: httpx.AsyncClient = Depends(get_openrouter_client)
 ):
     """
     Generate AI description from image without creating product
     Returns description that can be used in the form
     """
     try:
-        # Read and encode image
-        image_bytes = await image.read()
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
+        upload = await spool_upload(image)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
         # Generate description
+        image_base64, image_mime = await ImageVariantService.encode_for_vision(await upload.read_bytes())
         description, error = await LLMService.generate_description(
             image_base64=image_base64,
+            image_mime=image_mime,
             product_name=product_name,
-            category=category
+            category=category,
+            client=llm_client,
+            image_hash=upload.sha256
         )
         
         if error:
@@ -133,10 +187,82 @@ async def generate_description_from_image(
         }
 
 
-@router.post("/{product_id}/regenerate-description")
+@router.post("/generate-description/stream", dependencies=AI_RATE_LIMIT)
+async def stream_description_from_image(
+    image: UploadFile = File(...),
+    product_name: str = Form(...),
+    category: str = Form(...),
+    llm_client: httpx.AsyncClient = Depends(get_openrouter_client)
+):
+    """
+    Like /generate-description, but relays tokens as Server-Sent Events:
+    `token` ({"text"}) per chunk, then `done` ({"description", "model"})
+    or `error` ({"error"})
+    """
+    try:
+        upload = await spool_upload(image)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    image_base64, image_mime = await ImageVariantService.encode_for_vision(await upload.read_bytes())
+    
+    return sse_response(LLMService.stream_description(
+        image_base64=image_base64,
+        image_mime=image_mime,
+        product_name=product_name,
+        category=category,
+        client=llm_client,
+        image_hash=upload.sha256,
+    ))
+
+
+@router.post("/{product_id}/regenerate-description/stream", dependencies=AI_RATE_LIMIT)
+async def stream_regenerate_description(
+    product_id: str,
+    db: AsyncSession = Depends(get_db),
+    llm_client: httpx.AsyncClient = Depends(get_openrouter_client),
+    current_user = Depends(get_current_admin)
+):
+    """
+    Regenerate an existing product's description, streaming tokens as
+    Server-Sent Events; the final text is saved before the `done` event
+    """
+    product = await ProductService.get_product_by_id(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    image = await AIJobService.product_vision_image(product)
+    if not image:
+        raise HTTPException(status_code=400, detail="No image data found")
+    image_base64, image_mime = image
+    
+    async def events():
+        async for event, data in LLMService.stream_description(
+            image_base64=image_base64,
+            image_mime=image_mime,
+            product_name=product.name,
+            category=product.category,
+            client=llm_client,
+            image_hash=product.image_key or None,
+            use_cache=False,
+        ):
+            if event == "done":
+                # The request session may be gone once streaming starts
+                async with AsyncSessionLocal() as session:
+                    data = {
+                        **data,
+                        "saved": await ProductService.set_description(
+                            session, product_id, data["description"]
+                        ),
+                    }
+            yield event, data
+    
+    return sse_response(events())
+
+
+@router.post("/{product_id}/regenerate-description", dependencies=AI_RATE_LIMIT)
 async def regenerate_description(
     product_id: str,
     db: AsyncSession = Depends(get_db),
+    llm_client: httpx.AsyncClient = Depends(get_openrouter_client),
     current_user = Depends(get_current_admin)
 ):
     """
@@ -144,41 +270,112 @@ async def regenerate_description(
     """
     try:
         # Get product
-        result = await db.execute(
-            f"SELECT * FROM products WHERE id = '{product_id}'"
-        )
-        product = result.first()
+        product = await ProductService.get_product_by_id(db, product_id)
         
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        # Extract base64 from data URL
-        if product.image_data and "base64," in product.image_data:
-            image_base64 = product.image_data.split("base64,")[1]
-            
-            # Generate new description
-            new_description, error = await LLMService.generate_description(
-                image_base64=image_base64,
-                product_name=product.name,
-                category=product.category
+        # Generate new description
+        # An explicit regenerate asks for new text, so skip the cached one
+        try:
+            new_description, error, _ = await AIJobService.describe_product(
+                product, client=llm_client, use_cache=False
             )
-            
-            if error:
-                raise HTTPException(status_code=500, detail=error)
-            
-            # Update product
-            product.description = new_description
-            await db.commit()
-            
-            return {
-                "success": True,
-                "description": new_description
-            }
-        else:
-            raise HTTPException(status_code=400, detail="No image data found")
+        except ProductImageMissing as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if error:
+            raise HTTPException(status_code=500, detail=error)
+        
+        # Update product
+        await ProductService.set_description(db, product.id, new_description)
+        
+        return {
+            "success": True,
+            "description": new_description
+        }
             
     except HTTPException:
         raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# ============== BACKGROUND JOBS ==============
+
+@router.post(
+    "/{product_id}/description-jobs",
+    dependencies=AI_RATE_LIMIT,
+    response_model=AIJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def enqueue_description_job(
+    product_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_admin)
+):
+    """
+    Queue description generation for an existing product and return the
+    job at once; poll GET /jobs/{job_id} for the result
+    """
+    product = await ProductService.get_product_by_id(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    job_ids = await AIJobService.enqueue_descriptions(db, [product_id])
+    job = await AIJobService.get_job(db, job_ids[0])
+    return AIJobResponse(**job.to_dict())
+
+
+@router.post(
+    "/description-jobs",
+    dependencies=AI_RATE_LIMIT,
+    response_model=AIJobBatchResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def enqueue_description_jobs(
+    body: ProductBulkSelection,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_admin)
+):
+    """Queue description generation for products by `ids`, `category` or `all`"""
+    try:
+        where = bulk_filter(body.ids, body.category, body.all)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = await db.execute(select(Product.id).where(where).order_by(Product.created_at))
+    job_ids = await AIJobService.enqueue_descriptions(db, list(result.scalars().all()))
+    return AIJobBatchResponse(count=len(job_ids), jobIds=job_ids)
+
+
+@router.get("/cache-stats")
+async def get_llm_cache_stats(current_user = Depends(get_current_admin)):
+    """Description cache counters for this process"""
+    return llm_cache.stats()
+
+
+@router.get("/model-stats")
+async def get_model_stats(current_user = Depends(get_current_admin)):
+    """Per-model circuit breaker state, success rate and latency for this process"""
+    return LLMService.model_stats()
+
+
+@router.get("/jobs/stats")
+async def get_job_queue_stats(current_user = Depends(get_current_admin)):
+    """Worker pool counters for this process"""
+    return ai_job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=AIJobResponse)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_admin)
+):
+    """Poll a background job"""
+    job = await AIJobService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return AIJobResponse(**job.to_dict())
@@ -4,13 +4,14 @@ Authentication Router
 Simple token-based admin authentication
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.schemas.admin import AdminLogin, AdminResponse, Token
 from app.services.auth import AuthService, get_current_admin
+from app.services.rate_limit import check_rate_limit, client_ip
 from app.config import settings
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
@@ -18,8 +19,18 @@ security = HTTPBearer(auto_error=False)
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: AdminLogin, db: AsyncSession = Depends(get_db)):
+async def login(credentials: AdminLogin, request: Request, db: AsyncSession = Depends(get_db)):
     """Admin login - returns token"""
+    # Throttle before touching the database or hashing anything
+    await check_rate_limit(
+        "login-ip", client_ip(request),
+        settings.login_ip_rate_per_minute, settings.login_ip_burst,
+    )
+    await check_rate_limit(
+        "login-email", credentials.email.strip().lower(),
+        settings.login_email_rate_per_minute, settings.login_email_burst,
+    )
+    
     admin = await AuthService.authenticate_admin(db, credentials.email, credentials.password)
     
     if not admin:
@@ -29,7 +40,7 @@ async def login(credentials: AdminLogin, db: AsyncSession = Depends(get_db)):
         )
     
     # Generate simple token
-    token = AuthService.create_session(admin.id, admin.email)
+    token = await AuthService.create_session(admin)
     
     return Token(
         access_token=token,
@@ -47,29 +58,18 @@ async def login(credentials: AdminLogin, db: AsyncSession = Depends(get_db)):
 async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Logout - invalidate token"""
     if credentials:
-        AuthService.invalidate_token(credentials.credentials)
+        await AuthService.invalidate_token(credentials.credentials)
     return {"message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=AdminResponse)
-async def get_me(
-    session: dict = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get current admin info"""
-    admin = await AuthService.get_admin_by_id(db, session["admin_id"])
-    
-    if not admin:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Admin not found",
-        )
-    
+async def get_me(session: dict = Depends(get_current_admin)):
+    """Get current admin info (from the session snapshot, no database query)"""
     return AdminResponse(
-        id=admin.id,
-        email=admin.email,
-        displayName=admin.display_name or "",
-        isAdmin=admin.is_admin,
+        id=session["admin_id"],
+        email=session["email"],
+        displayName=session["admin"].display_name,
+        isAdmin=session["admin"].is_admin,
     )
 
 
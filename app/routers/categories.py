@@ -5,13 +5,14 @@ API endpoints for category operations
 """
 
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.schemas.category import CategoryCreate, CategoryResponse
 from app.services.category import CategoryService
 from app.services.auth import get_current_admin
+from app.services.http_cache import cache_headers, is_not_modified, not_modified_response
 
 router = APIRouter(prefix="/api/categories", tags=["Categories"])
 
@@ -19,8 +20,17 @@ router = APIRouter(prefix="/api/categories", tags=["Categories"])
 # ============== PUBLIC ENDPOINTS ==============
 
 @router.get("", response_model=List[CategoryResponse])
-async def get_categories(db: AsyncSession = Depends(get_db)):
-    """Get all enabled categories (public)"""
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all enabled categories (public, supports conditional requests)"""
+    etag, last_modified = await CategoryService.get_enabled_validator(db)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    response.headers.update(cache_headers(etag, last_modified))
+    
     categories = await CategoryService.get_enabled_categories(db)
     return [CategoryResponse(**c.to_dict()) for c in categories]
 
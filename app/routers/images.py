@@ -2,14 +2,35 @@
 Image Proxy Router
 ==================
 Proxies Google Drive images to avoid CORS issues
+and serves stored product images and resized variants
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 import httpx
+import logging
 import re
 
+from app.config import settings
+from app.services.auth import get_current_admin
+from app.services.drive_images import DriveImageService, ProxiedImage, image_cache, open_image
+from app.services.http_clients import get_drive_client, get_external_client
+from app.services.image_store import get_image_store, is_valid_key, sniff_content_type
+from app.services.image_variants import ImageVariantService, variant_cache
+from app.services.rate_limit import rate_limit
+
 router = APIRouter(prefix="/api/images", tags=["Images"])
+logger = logging.getLogger(__name__)
+
+DRIVE_CACHE_CONTROL = "public, max-age=86400"
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Proxied fetches cost an upstream request (and maybe a resize), so they are throttled per client
+PROXY_RATE_LIMIT = [Depends(rate_limit("image-proxy", settings.image_proxy_rate_per_minute, settings.image_proxy_burst))]
+
+# `w` query parameter: requested display width in pixels
+WidthQuery = Query(None, ge=1, le=4000, description="Resize to a width variant (200/400/800)")
 
 
 def extract_file_id(url: str) -> str:
@@ -40,11 +61,81 @@ def extract_file_id(url: str) -> str:
     return ""
 
 
-@router.get("/proxy")
-async def proxy_image(url: str):
+def variant_headers(cache_control: str) -> dict:
+    return {
+        "Cache-Control": cache_control,
+        "Access-Control-Allow-Origin": "*",
+        "Vary": "Accept",
+    }
+
+
+async def drive_response(
+    drive_client: httpx.AsyncClient,
+    file_id: str,
+    width: Optional[int],
+    request: Request,
+) -> Optional[Response]:
+    """Original (streamed) or resized Drive image, or None if not found"""
+    if width and ImageVariantService.is_available():
+        fmt = ImageVariantService.pick_format(request.headers.get("accept", ""))
+        try:
+            variant = await ImageVariantService.get_drive_variant(drive_client, file_id, width, fmt)
+        except Exception as e:
+            logger.warning("Image resize failed for Drive file %s: %s", file_id, e)
+            variant = None
+        if variant is not None:
+            return Response(content=variant[1], media_type=variant[0], headers=variant_headers(DRIVE_CACHE_CONTROL))
+        # Resize failed or the file is missing: fall back to the original
+    
+    image = await DriveImageService.get_image(drive_client, file_id)
+    if image is None:
+        return None
+    return proxied_image_response(image)
+
+
+class ProxiedImageResponse(StreamingResponse):
+    """
+    Streams a ProxiedImage and always closes it afterwards, even if the
+    client disconnects before (or while) the body is sent
+    """
+
+    def __init__(self, image: ProxiedImage, headers: Optional[dict] = None):
+        super().__init__(image.chunks, media_type=image.content_type, headers=headers)
+        self.image = image
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.image.aclose()
+
+
+def proxied_image_response(image: ProxiedImage) -> Response:
+    """Response for a cached body or a live upstream stream"""
+    headers = {
+        "Cache-Control": DRIVE_CACHE_CONTROL,
+        "Access-Control-Allow-Origin": "*",
+        "X-Cache": "HIT" if image.cache_hit else "MISS",
+    }
+    if image.body is not None:
+        return Response(content=image.body, media_type=image.content_type, headers=headers)
+    if image.content_length is not None:
+        headers["Content-Length"] = str(image.content_length)
+    return ProxiedImageResponse(image, headers=headers)
+
+
+@router.get("/proxy", dependencies=PROXY_RATE_LIMIT)
+async def proxy_image(
+    url: str,
+    request: Request,
+    w: Optional[int] = WidthQuery,
+    drive_client: httpx.AsyncClient = Depends(get_drive_client),
+    external_client: httpx.AsyncClient = Depends(get_external_client),
+):
     """
     Proxy Google Drive images to avoid CORS issues.
     Accepts any Google Drive URL format and serves the image.
+    `w` serves a resized variant instead of the original (Drive URLs only).
     """
     if not url:
         raise HTTPException(status_code=400, detail="URL parameter required")
@@ -54,75 +145,92 @@ async def proxy_image(url: str):
     
     if not file_id:
         # Not a Google Drive URL, try to fetch directly
+        if w:
+            raise HTTPException(status_code=400, detail="Resizing (w) is only supported for Google Drive images")
         try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    return StreamingResponse(
-                        iter([response.content]),
-                        media_type=response.headers.get("content-type", "image/jpeg")
-                    )
+            upstream = await open_image(external_client, url)
         except Exception:
-            pass
-        raise HTTPException(status_code=400, detail="Invalid URL or unable to fetch")
+            upstream = None
+        if upstream is None:
+            raise HTTPException(status_code=400, detail="Invalid URL or unable to fetch")
+        return ProxiedImageResponse(ProxiedImage(
+            upstream.content_type, chunks=upstream.iter_bytes(), on_close=upstream.aclose,
+        ))
     
-    # Try multiple Google Drive URL formats
-    urls_to_try = [
-        f"https://drive.google.com/uc?export=download&id={file_id}",
-        f"https://drive.google.com/thumbnail?id={file_id}&sz=w800",
-        f"https://lh3.googleusercontent.com/d/{file_id}",
-    ]
-    
-    async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
-        for drive_url in urls_to_try:
-            try:
-                response = await client.get(drive_url)
-                if response.status_code == 200 and len(response.content) > 1000:
-                    content_type = response.headers.get("content-type", "image/jpeg")
-                    if "text/html" not in content_type:
-                        return StreamingResponse(
-                            iter([response.content]),
-                            media_type=content_type,
-                            headers={
-                                "Cache-Control": "public, max-age=86400",
-                                "Access-Control-Allow-Origin": "*"
-                            }
-                        )
-            except Exception:
-                continue
-    
-    raise HTTPException(status_code=404, detail="Image not found or not accessible")
+    response = await drive_response(drive_client, file_id, w, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Image not found or not accessible")
+    return response
 
 
-@router.get("/drive/{file_id}")
-async def get_drive_image(file_id: str):
+@router.get("/drive/{file_id}", dependencies=PROXY_RATE_LIMIT)
+async def get_drive_image(
+    file_id: str,
+    request: Request,
+    w: Optional[int] = WidthQuery,
+    drive_client: httpx.AsyncClient = Depends(get_drive_client),
+):
     """
     Get image directly by Google Drive file ID.
+    `w` serves a resized variant instead of the original.
     """
     if not file_id or len(file_id) < 10:
         raise HTTPException(status_code=400, detail="Invalid file ID")
     
-    urls_to_try = [
-        f"https://drive.google.com/uc?export=download&id={file_id}",
-        f"https://drive.google.com/thumbnail?id={file_id}&sz=w800",
-    ]
+    response = await drive_response(drive_client, file_id, w, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return response
+
+
+@router.get("/cache-stats")
+async def get_image_cache_stats(_: dict = Depends(get_current_admin)):
+    """Image proxy and variant cache counters for this worker (admin only)"""
+    return {
+        "proxy": image_cache.stats(),
+        "variants": variant_cache.stats(),
+        "resizeAvailable": ImageVariantService.is_available(),
+    }
+
+
+@router.get("/blob/{key}")
+async def get_image_blob(
+    key: str,
+    request: Request,
+    w: Optional[int] = WidthQuery,
+):
+    """
+    Serve a stored product image by its content hash.
+    Blobs are immutable, so they can be cached forever.
+    `w` serves a resized variant instead of the original.
+    """
+    if not is_valid_key(key):
+        raise HTTPException(status_code=400, detail="Invalid image key")
+    
+    if w and ImageVariantService.is_available():
+        fmt = ImageVariantService.pick_format(request.headers.get("accept", ""))
+        try:
+            variant = await ImageVariantService.get_stored_variant(key, w, fmt)
+        except Exception as e:
+            logger.warning("Image resize failed for %s: %s", key, e)
+            variant = None
+        if variant is not None:
+            return Response(
+                content=variant[1],
+                media_type=variant[0],
+                headers={**variant_headers(BLOB_CACHE_CONTROL), "ETag": f'"{key}-{ImageVariantService.normalize_width(w)}-{fmt}"'}
+            )
     
-    async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
-        for url in urls_to_try:
-            try:
-                response = await client.get(url)
-                if response.status_code == 200 and len(response.content) > 1000:
-                    content_type = response.headers.get("content-type", "image/jpeg")
-                    if "text/html" not in content_type:
-                        return StreamingResponse(
-                            iter([response.content]),
-                            media_type=content_type,
-                            headers={
-                                "Cache-Control": "public, max-age=86400",
-                                "Access-Control-Allow-Origin": "*"
-                            }
-                        )
-            except Exception:
-                continue
+    data = await get_image_store().get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
     
-    raise HTTPException(status_code=404, detail="Image not found")
+    return Response(
+        content=data,
+        media_type=sniff_content_type(data),
+        headers={
+            "Cache-Control": BLOB_CACHE_CONTROL,
+            "ETag": f'"{key}"',
+            "Access-Control-Allow-Origin": "*"
+        }
+    )
@@ -4,57 +4,180 @@ Products Router
 API endpoints for product operations
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.database import get_db
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
-from app.services.product import ProductService
+from app.config import settings
+from app.database import AsyncSessionLocal, get_db, get_read_db, read_sessionmaker
+from app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductPage,
+    ProductImportResult,
+    ProductBulkSelection,
+    ProductBulkEnabled,
+    ProductBulkDiscount,
+    ProductBulkResult,
+)
+from app.services.product import (
+    ProductService,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    RESPONSE_FIELDS,
+    catalog_cache,
+    parse_fields,
+)
+from app.services.product_import import (
+    IMPORT_FORMAT_PATTERN,
+    ImportFormatError,
+    detect_format,
+    parse_rows,
+    validate_rows,
+)
 from app.services.auth import get_current_admin
+from app.services.streaming import json_stream_response
+from app.services.image_variants import ImageVariantService
+from app.services.http_cache import (
+    cache_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+
+STREAM_FORMAT_PATTERN = "^(json|ndjson)$"
 
 router = APIRouter(prefix="/api/products", tags=["Products"])
 
 
+def stream_products_response(fmt: str, sessionmaker: async_sessionmaker, **filters):
+    """
+    Streaming response over ProductService.stream_products.
+    Uses its own session from `sessionmaker` (primary or replica) so the
+    cursor outlives the request dependency.
+    """
+    async def items():
+        async with sessionmaker() as db:
+            async for item in ProductService.stream_products(db, **filters):
+                yield item
+    
+    return json_stream_response(items(), fmt)
+
+
 # ============== PUBLIC ENDPOINTS ==============
 
-@router.get("", response_model=List[ProductResponse])
+@router.get("", response_model=Union[List[ProductResponse], ProductPage])
 async def get_products(
+    request: Request,
+    response: Response,
     category: str = None,
-    db: AsyncSession = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: Optional[str] = Query(None, pattern=STREAM_FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get enabled products (public)"""
-    if category:
-        products = await ProductService.get_products_by_category(db, category)
-    else:
-        products = await ProductService.get_enabled_products(db)
+    """
+    Get enabled products (public)
     
-    return [ProductResponse(**p.to_dict()) for p in products]
+    Without `limit`, `cursor` or `fields` returns the full list. Otherwise
+    returns a page `{items, nextCursor}` ordered newest first; pass
+    `nextCursor` back as `cursor` for the next page. `fields` is a
+    comma-separated projection, e.g. `id,name,finalPrice,thumbnail`.
+    
+    `stream=json|ndjson` streams the full (unpaginated) list from a
+    server-side cursor instead of building it in memory; it cannot be
+    combined with `limit` or `cursor`.
+    
+    Supports conditional requests (If-None-Match / If-Modified-Since).
+    """
+    if stream and (limit is not None or cursor is not None):
+        raise HTTPException(status_code=400, detail="stream cannot be combined with limit or cursor")
+    
+    etag, last_modified = await ProductService.get_catalog_validator(db, category)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    headers = cache_headers(etag, last_modified)
+    response.headers.update(headers)
+    
+    if stream:
+        try:
+            selected = parse_fields(fields) if fields else RESPONSE_FIELDS
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        streaming = stream_products_response(
+            stream, read_sessionmaker(), fields=selected, category=category
+        )
+        streaming.headers.update(headers)
+        return streaming
+    
+    if limit is not None or cursor is not None or fields is not None:
+        try:
+            items, next_cursor = await ProductService.get_products_page(
+                db,
+                fields=parse_fields(fields),
+                limit=limit or DEFAULT_PAGE_SIZE,
+                cursor=cursor,
+                category=category,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ProductPage(items=items, nextCursor=next_cursor)
+    
+    products = await ProductService.get_catalog(db, category)
+    return [ProductResponse(**p) for p in products]
 
 
 @router.get("/stats")
-async def get_product_stats(db: AsyncSession = Depends(get_db)):
+async def get_product_stats(db: AsyncSession = Depends(get_read_db)):
     """Get product statistics for dashboard"""
     return await ProductService.get_product_stats(db)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: str, db: AsyncSession = Depends(get_db)):
-    """Get single product by ID"""
-    product = await ProductService.get_product_by_id(db, product_id)
+async def get_product(
+    product_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get single product by ID (supports If-None-Match / If-Modified-Since)"""
+    product = await ProductService.get_catalog_product(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return ProductResponse(**product.to_dict())
+    
+    etag = make_etag("product", product["id"], product["updatedAt"])
+    last_modified = datetime.fromisoformat(product["updatedAt"]) if product["updatedAt"] else None
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    response.headers.update(cache_headers(etag, last_modified))
+    return ProductResponse(**product)
 
 
 # ============== ADMIN ENDPOINTS ==============
 
+@router.get("/admin/cache-stats")
+async def get_cache_stats(_: dict = Depends(get_current_admin)):
+    """Catalog read cache counters for this worker (admin only)"""
+    return catalog_cache.stats()
+
+
 @router.get("/admin/all", response_model=List[ProductResponse])
 async def get_all_products(
+    stream: Optional[str] = Query(None, pattern=STREAM_FORMAT_PATTERN),
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_admin)
 ):
-    """Get all products including disabled (admin only)"""
+    """
+    Get all products including disabled (admin only)
+    `stream=json|ndjson` streams rows instead of building the full list.
+    """
+    if stream:
+        # Admins must see their own writes: always the primary
+        return stream_products_response(stream, AsyncSessionLocal, enabled_only=False)
+    
     products = await ProductService.get_all_products(db)
     return [ProductResponse(**p.to_dict()) for p in products]
 
@@ -62,15 +185,74 @@ async def get_all_products(
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product: ProductCreate,
+    background_tasks: BackgroundTasks,
     image_data: str = "",
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_admin)
 ):
     """Create a new product (admin only)"""
     new_product = await ProductService.create_product(db, product, image_data)
+    background_tasks.add_task(ImageVariantService.pregenerate, new_product.image_key)
     return ProductResponse(**new_product.to_dict())
 
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[str] = Query(None, pattern=IMPORT_FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_admin)
+):
+    """
+    Bulk-create products (admin only) from a JSON array, NDJSON or CSV,
+    sent as the request body or as a multipart `file` upload. The format
+    comes from `format=`, the file extension or the content type. Each row
+    is validated like POST /api/products and may carry `imageData`; valid
+    rows are inserted in batches and invalid rows are reported by number
+    (source line for NDJSON and CSV, array position for JSON).
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing import file")
+        filename, content_type = upload.filename, upload.content_type
+        body = await upload.read(settings.max_import_bytes + 1)
+    else:
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > settings.max_import_bytes:
+                break
+    if len(body) > settings.max_import_bytes:
+        raise HTTPException(status_code=413, detail="Import too large")
+    
+    fmt = format or detect_format(content_type, filename)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Unknown import format, use json, ndjson or csv")
+    try:
+        rows = parse_rows(bytes(body), fmt)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    valid, errors = validate_rows(rows)
+    created, insert_errors = await ProductService.bulk_create(db, valid)
+    errors = sorted(errors + insert_errors, key=lambda e: e["row"])
+    
+    for key in {item["imageKey"] for item in created if item["imageKey"]}:
+        background_tasks.add_task(ImageVariantService.pregenerate, key)
+    
+    return ProductImportResult(
+        created=len(created),
+        failed=len(errors),
+        products=created,
+        errors=errors,
+    )
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: str,
@@ -110,3 +292,51 @@ async def delete_product(
     if not success:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"success": True}
+
+
+@router.patch("/bulk/enabled", response_model=ProductBulkResult)
+async def bulk_set_enabled(
+    body: ProductBulkEnabled,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_admin)
+):
+    """Enable or disable products by `ids`, `category` or `all` in one statement (admin only)"""
+    try:
+        ids = await ProductService.bulk_set_enabled(
+            db, body.enabled, ids=body.ids, category=body.category, all_products=body.all
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProductBulkResult(count=len(ids), ids=ids)
+
+
+@router.patch("/bulk/discount", response_model=ProductBulkResult)
+async def bulk_set_discount(
+    body: ProductBulkDiscount,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_admin)
+):
+    """Set the discount (and final price) of products by `ids`, `category` or `all` (admin only)"""
+    try:
+        ids = await ProductService.bulk_set_discount(
+            db, body.discount, ids=body.ids, category=body.category, all_products=body.all
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProductBulkResult(count=len(ids), ids=ids)
+
+
+@router.post("/bulk/delete", response_model=ProductBulkResult)
+async def bulk_delete(
+    body: ProductBulkSelection,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_admin)
+):
+    """Delete products by `ids` or `category` in one statement (admin only)"""
+    if body.all:
+        raise HTTPException(status_code=400, detail="Deleting all products is not supported")
+    try:
+        ids = await ProductService.bulk_delete(db, ids=body.ids, category=body.category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ProductBulkResult(count=len(ids), ids=ids)
@@ -4,22 +4,42 @@ Settings Router
 API endpoints for site settings
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db, get_read_db
 from app.schemas.settings import SettingsUpdate, SettingsResponse
 from app.services.settings import SettingsService
 from app.services.auth import get_current_admin
+from app.services.http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
 
 router = APIRouter(prefix="/api/settings", tags=["Settings"])
 
 
 @router.get("", response_model=SettingsResponse)
-async def get_settings(db: AsyncSession = Depends(get_db)):
-    """Get site settings (public)"""
-    settings = await SettingsService.get_settings(db)
-    return SettingsResponse(**settings.to_dict())
+async def get_settings(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get site settings (public, supports If-None-Match).
+    Not cached in-process: the ETag is hashed from a one-row read on every
+    request, so all workers agree on it as soon as the settings change.
+    """
+    settings = await SettingsService.find_settings(db)
+    if settings is None:
+        # First run: the default row is created on the primary
+        async with AsyncSessionLocal() as primary:
+            settings = await SettingsService.get_settings(primary)
+    data = settings.to_dict()
+    
+    # Single small row: hash its values instead of tracking a modification time
+    etag = make_etag("settings", *(data[key] for key in sorted(data)))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(cache_headers(etag))
+    return SettingsResponse(**data)
 
 
 @router.put("", response_model=SettingsResponse)
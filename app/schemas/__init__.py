@@ -1,12 +1,20 @@
 # Pydantic Schemas
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductPage,
+    ProductImportError, ProductImportResult,
+    ProductBulkSelection, ProductBulkEnabled, ProductBulkDiscount, ProductBulkResult,
+)
 from app.schemas.category import CategoryCreate, CategoryResponse
 from app.schemas.admin import AdminCreate, AdminLogin, AdminResponse, Token
 from app.schemas.settings import SettingsUpdate, SettingsResponse
+from app.schemas.ai_job import AIJobResponse, AIJobBatchResponse
 
 __all__ = [
-    "ProductCreate", "ProductUpdate", "ProductResponse",
+    "ProductCreate", "ProductUpdate", "ProductResponse", "ProductPage",
+    "ProductImportError", "ProductImportResult",
+    "ProductBulkSelection", "ProductBulkEnabled", "ProductBulkDiscount", "ProductBulkResult",
     "CategoryCreate", "CategoryResponse",
     "AdminCreate", "AdminLogin", "AdminResponse", "Token",
     "SettingsUpdate", "SettingsResponse",
+    "AIJobResponse", "AIJobBatchResponse",
 ]
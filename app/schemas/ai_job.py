@@ -0,0 +1,28 @@
+"""
+AI Job Schemas
+==============
+Pydantic models for background AI description jobs
+"""
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class AIJobResponse(BaseModel):
+    id: str
+    kind: str
+    productId: Optional[str] = None
+    status: str
+    model: str = ""
+    result: str = ""
+    error: str = ""
+    attempts: int = 0
+    createdAt: Optional[str] = None
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+
+
+class AIJobBatchResponse(BaseModel):
+    """Jobs queued by a batch enqueue, one per product"""
+    count: int
+    jobIds: List[str]
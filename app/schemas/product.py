@@ -22,7 +22,9 @@ class ProductBase(BaseModel):
     description: str = ""
     enabled: bool = True
     sizes: List[str] = ["S", "M", "L", "XL"]
-    colors: List[ColorVariantSchema] = [{"name": "Black", "hex": "#000000"}]
+    colors: List[ColorVariantSchema] = Field(
+        default_factory=lambda: [ColorVariantSchema(name="Black", hex="#000000")]
+    )
 
 
 class ProductCreate(ProductBase):
@@ -50,6 +52,7 @@ class ProductResponse(BaseModel):
     finalPrice: float
     description: str
     imageData: str
+    imageKey: str = ""
     enabled: bool
     sizes: List[str]
     colors: List[dict]
@@ -58,3 +61,45 @@ class ProductResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class ProductPage(BaseModel):
+    """One page of a keyset-paginated product listing"""
+    items: List[dict]
+    nextCursor: Optional[str] = None
+
+
+class ProductImportError(BaseModel):
+    """Validation or insert errors for one import row (1-based)"""
+    row: int
+    errors: List[str]
+
+
+class ProductImportResult(BaseModel):
+    """Outcome of a bulk product import"""
+    created: int
+    failed: int
+    products: List[dict]
+    errors: List[ProductImportError]
+
+
+class ProductBulkSelection(BaseModel):
+    """Products targeted by a bulk operation: a list of IDs, a category, or all"""
+    ids: Optional[List[str]] = None
+    category: Optional[str] = None
+    all: bool = False
+
+
+class ProductBulkEnabled(ProductBulkSelection):
+    enabled: bool
+
+
+class ProductBulkDiscount(ProductBulkSelection):
+    discount: float = Field(..., ge=0, le=100)
+
+
+class ProductBulkResult(BaseModel):
+    """IDs of the products a bulk operation changed"""
+    success: bool = True
+    count: int
+    ids: List[str]
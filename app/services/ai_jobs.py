@@ -0,0 +1,296 @@
+"""
+AI Job Queue
+============
+In-process queue for AI description generation. Requests enqueue a job
+row and return its ID at once; a bounded pool of worker tasks runs the
+jobs, with a per-provider semaphore capping concurrent upstream calls.
+Job status lives in the ai_jobs table, so any worker process can answer
+a poll. Each process also polls the table every ai_job_poll_seconds, so
+jobs queued by another process (or left behind by a restart or a lost
+worker) are picked up.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set
+
+import httpx
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.ai_job import AIJob
+from app.models.product import Product
+from app.services.http_clients import OPENROUTER
+from app.services.image_store import read_image_bytes
+from app.services.image_variants import ImageVariantService
+from app.services.llm import LLMService
+from app.services.product import ProductService
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+DESCRIPTION_JOB = "description"
+
+# Running jobs older than this are assumed lost (e.g. the process restarted)
+STALE_JOB_SECONDS = 600
+
+
+class ProductImageMissing(Exception):
+    """The product has no stored image to describe"""
+
+    def __init__(self, message: str = "No image data found"):
+        super().__init__(message)
+
+
+class AIJobQueue:
+    """Bounded pool of worker tasks fed from an asyncio queue of job IDs"""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._poller: Optional[asyncio.Task] = None
+        # Submitted but not yet picked up by a worker, so polls don't queue them twice
+        self._pending: Set[str] = set()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.active = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def provider_semaphore(self, provider: str) -> asyncio.Semaphore:
+        """Caps concurrent calls to one upstream provider across all workers"""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = self._semaphores[provider] = asyncio.Semaphore(settings.ai_provider_concurrency)
+        return semaphore
+
+    async def start(self) -> None:
+        """Start the workers and resume unfinished jobs (called from the app lifespan)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ai-job-worker-{i}")
+            for i in range(settings.ai_job_workers)
+        ]
+        await self.poll()
+        if settings.ai_job_poll_seconds > 0:
+            self._poller = asyncio.create_task(self._poll_forever(), name="ai-job-poller")
+        logger.info("AI job queue started with %d workers", len(self._workers))
+
+    async def stop(self) -> None:
+        """Cancel the workers; unfinished jobs are resumed on the next start"""
+        tasks = self._workers + ([self._poller] if self._poller else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._poller = None
+        self._queue = None
+        self._pending.clear()
+
+    def submit(self, job_ids: Sequence[str]) -> None:
+        """Hand queued job IDs to the workers; without workers they wait in the table"""
+        if self._queue is None:
+            return
+        for job_id in job_ids:
+            if job_id not in self._pending:
+                self._pending.add(job_id)
+                self._queue.put_nowait(job_id)
+
+    async def poll(self) -> None:
+        """Submit queued jobs from the table, requeueing stale running ones first"""
+        try:
+            self.submit(await AIJobService.recover_jobs())
+        except Exception as e:
+            logger.warning("Could not poll AI jobs: %s", e)
+
+    async def _poll_forever(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ai_job_poll_seconds)
+            await self.poll()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            self.active += 1
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception("AI job %s crashed: %s", job_id, e)
+            finally:
+                self.active -= 1
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            product_id = await AIJobService.claim_job(db, job_id)
+            if product_id is None:
+                # Unknown, or already claimed by another worker process
+                return
+
+            description, error, model = "", "", ""
+            try:
+                product = await ProductService.get_product_by_id(db, product_id)
+                if product is None:
+                    error = "Product not found"
+                else:
+                    async with self.provider_semaphore(OPENROUTER):
+                        description, error, model = await AIJobService.describe_product(product)
+                    if not error:
+                        await ProductService.set_description(db, product.id, description)
+            except ProductImageMissing as e:
+                error = str(e)
+            except Exception as e:
+                await db.rollback()
+                error = str(e)
+
+            await AIJobService.finish_job(db, job_id, description, error, model)
+            if error:
+                self.failed += 1
+            else:
+                self.succeeded += 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pollSeconds": settings.ai_job_poll_seconds,
+            "active": self.active,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+ai_job_queue = AIJobQueue()
+
+
+class AIJobService:
+    """Job rows for background AI description generation"""
+
+    @staticmethod
+    async def product_vision_image(product: Product) -> Optional[tuple[str, str]]:
+        """(base64, MIME type) of a product's stored image, prepared for the vision model"""
+        image_bytes = await read_image_bytes(product.image_key, product.image_data)
+        if not image_bytes:
+            return None
+        return await ImageVariantService.encode_for_vision(image_bytes)
+
+    @staticmethod
+    async def describe_product(
+        product: Product,
+        client: Optional[httpx.AsyncClient] = None,
+        use_cache: bool = True,
+    ) -> tuple[str, str, str]:
+        """
+        Generate a description from a product's stored image
+        Returns: (description, error_message, model used)
+        Raises: ProductImageMissing if the product has no image
+        """
+        image = await AIJobService.product_vision_image(product)
+        if not image:
+            raise ProductImageMissing()
+        image_base64, image_mime = image
+        return await LLMService.generate_description_with_model(
+            image_base64=image_base64,
+            image_mime=image_mime,
+            product_name=product.name,
+            category=product.category,
+            client=client,
+            image_hash=product.image_key or None,
+            use_cache=use_cache,
+        )
+
+    @staticmethod
+    async def enqueue_descriptions(db: AsyncSession, product_ids: Sequence[str]) -> List[str]:
+        """Create one queued description job per product and submit them; returns job IDs"""
+        job_ids = await AIJobService.add_description_jobs(db, product_ids)
+        await db.commit()
+        ai_job_queue.submit(job_ids)
+        return job_ids
+
+    @staticmethod
+    async def add_description_jobs(db: AsyncSession, product_ids: Sequence[str]) -> List[str]:
+        """
+        Insert queued description jobs in the caller's transaction (not
+        committed); submit the IDs to ai_job_queue once it commits
+        """
+        if not product_ids:
+            return []
+        result = await db.execute(
+            insert(AIJob)
+            .values([
+                {
+                    "id": str(uuid.uuid4()),
+                    "kind": DESCRIPTION_JOB,
+                    "product_id": product_id,
+                    "status": JOB_QUEUED,
+                }
+                for product_id in product_ids
+            ])
+            .returning(AIJob.id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: str) -> Optional[AIJob]:
+        result = await db.execute(select(AIJob).where(AIJob.id == job_id))
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def claim_job(db: AsyncSession, job_id: str) -> Optional[str]:
+        """Move a queued job to running; returns its product ID, or None if not claimable"""
+        result = await db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id, AIJob.status == JOB_QUEUED)
+            .values(status=JOB_RUNNING, started_at=func.now(), attempts=AIJob.attempts + 1)
+            .returning(AIJob.product_id)
+        )
+        product_id = result.scalar_one_or_none()
+        await db.commit()
+        return product_id
+
+    @staticmethod
+    async def finish_job(db: AsyncSession, job_id: str, result: str, error: str, model: str = "") -> None:
+        await db.execute(
+            update(AIJob)
+            .where(AIJob.id == job_id)
+            .values(
+                status=JOB_FAILED if error else JOB_SUCCEEDED,
+                model=model,
+                result=result,
+                error=error,
+                finished_at=func.now(),
+            )
+        )
+        await db.commit()
+
+    @staticmethod
+    async def recover_jobs() -> List[str]:
+        """Requeue stale running jobs and return the IDs of all queued jobs"""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=STALE_JOB_SECONDS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(AIJob)
+                .where(AIJob.status == JOB_RUNNING, AIJob.started_at < stale_before)
+                .values(status=JOB_QUEUED)
+            )
+            await db.commit()
+            result = await db.execute(
+                select(AIJob.id).where(AIJob.status == JOB_QUEUED).order_by(AIJob.created_at)
+            )
+            return list(result.scalars().all())
@@ -1,13 +1,13 @@
 """
 Authentication Service
 ======================
-Simple token-based authentication (no JWT complexity)
+Simple token-based authentication (no JWT complexity).
+Tokens are opaque session IDs or HMAC-signed, depending on SESSION_BACKEND.
 """
 
 import secrets
-import hashlib
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from fastapi import HTTPException, status, Depends
@@ -15,14 +15,12 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.config import settings
 from app.models.admin import Admin
+from app.services import passwords
+from app.services.sessions import AdminSnapshot, get_session_store
 
 
 security = HTTPBearer()
 
-# In-memory token store - simple approach
-# Tokens persist until server restart or manual logout
-active_tokens: Dict[str, dict] = {}
-
 
 class AuthService:
     """Simple token-based authentication"""
@@ -31,13 +29,13 @@ class AuthService:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password with SHA256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with the configured KDF (blocking; see passwords module)"""
+        return passwords.hash_password(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
-        return AuthService.hash_password(plain_password) == hashed_password
+        """Verify password against hash (blocking; see passwords module)"""
+        return passwords.verify_password(plain_password, hashed_password)
     
     @staticmethod
     def generate_token() -> str:
@@ -45,37 +43,54 @@ class AuthService:
         return secrets.token_urlsafe(32)
     
     @staticmethod
-    def create_session(admin_id: str, email: str) -> str:
+    def admin_snapshot(admin: Admin) -> AdminSnapshot:
+        return AdminSnapshot(display_name=admin.display_name or "", is_admin=bool(admin.is_admin))
+    
+    @staticmethod
+    async def create_session(admin: Admin) -> str:
         """Create session and return token"""
-        token = AuthService.generate_token()
-        active_tokens[token] = {
-            "admin_id": admin_id,
-            "email": email,
-            "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(hours=AuthService.TOKEN_EXPIRY_HOURS)
-        }
-        return token
+        now = datetime.now(timezone.utc)
+        return await get_session_store().issue({
+            "admin_id": admin.id,
+            "email": admin.email,
+            "admin": AuthService.admin_snapshot(admin),
+            "created_at": now,
+            "expires_at": now + timedelta(hours=AuthService.TOKEN_EXPIRY_HOURS)
+        })
     
     @staticmethod
-    def validate_token(token: str) -> Optional[dict]:
+    async def validate_token(token: str) -> Optional[dict]:
         """Validate token and return session"""
-        session = active_tokens.get(token)
-        if not session:
-            return None
-        
-        if datetime.utcnow() > session["expires_at"]:
-            del active_tokens[token]
-            return None
-        
-        return session
+        return await get_session_store().get(token)
     
     @staticmethod
-    def invalidate_token(token: str) -> bool:
+    async def invalidate_token(token: str) -> bool:
         """Logout - invalidate token"""
-        if token in active_tokens:
-            del active_tokens[token]
-            return True
-        return False
+        return await get_session_store().delete(token)
+    
+    @staticmethod
+    async def refresh_sessions(admin: Admin) -> None:
+        """Push the admin's current display name / role into their live sessions, if they differ"""
+        store = get_session_store()
+        snapshot = AuthService.admin_snapshot(admin)
+        if await store.admin_outdated(admin.id, snapshot):
+            await store.update_admin(admin.id, snapshot)
+    
+    @staticmethod
+    async def update_admin(
+        db: AsyncSession,
+        admin: Admin,
+        display_name: Optional[str] = None,
+        is_admin: Optional[bool] = None,
+    ) -> Admin:
+        """Change an admin's display name / role and apply it to their live sessions"""
+        if display_name is not None:
+            admin.display_name = display_name
+        if is_admin is not None:
+            admin.is_admin = is_admin
+        await db.commit()
+        await AuthService.refresh_sessions(admin)
+        return admin
     
     @staticmethod
     async def authenticate_admin(db: AsyncSession, email: str, password: str) -> Optional[Admin]:
@@ -83,13 +98,20 @@ class AuthService:
         result = await db.execute(select(Admin).where(Admin.email == email))
         admin = result.scalar_one_or_none()
         
-        if not admin:
-            return None
-        if not AuthService.verify_password(password, admin.password_hash):
+        # Unknown emails still pay for a verify, so timing does not reveal accounts
+        if not await passwords.verify_password_async(password, admin.password_hash if admin else None):
             return None
+        # Catches changes made outside update_admin (e.g. direct DB edits) to
+        # sessions from earlier logins; only writes if a snapshot is outdated
+        await AuthService.refresh_sessions(admin)
         if not admin.is_admin:
             return None
         
+        if passwords.needs_rehash(admin.password_hash):
+            # Legacy SHA-256 or outdated cost: upgrade while we know the password
+            admin.password_hash = await passwords.hash_password_async(password)
+            await db.commit()
+        
         return admin
     
     @staticmethod
@@ -109,7 +131,7 @@ class AuthService:
         """Create new admin"""
         admin = Admin(
             email=email,
-            password_hash=AuthService.hash_password(password),
+            password_hash=await passwords.hash_password_async(password),
             display_name=display_name,
             is_admin=True,
         )
@@ -122,9 +144,9 @@ class AuthService:
 async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Dependency to get current admin from token"""
     token = credentials.credentials
-    session = AuthService.validate_token(token)
+    session = await AuthService.validate_token(token)
     
-    if not session:
+    if not session or not session["admin"].is_admin:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
@@ -4,12 +4,15 @@ Category Service
 Business logic for category operations
 """
 
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 
+from app.database import mark_primary_write
 from app.models.category import Category
 from app.schemas.category import CategoryCreate
+from app.services.http_cache import make_etag
 
 
 class CategoryService:
@@ -25,6 +28,19 @@ class CategoryService:
         )
         return list(result.scalars().all())
     
+    @staticmethod
+    async def get_enabled_validator(db: AsyncSession) -> tuple[str, Optional[datetime]]:
+        """
+        Cheap validator for the enabled category list (COUNT + MAX(created_at))
+        Returns: (etag, last_modified)
+        """
+        result = await db.execute(
+            select(func.count(Category.id), func.max(Category.created_at))
+            .where(Category.enabled == True)
+        )
+        count, last_modified = result.one()
+        return make_etag("categories", count, last_modified), last_modified
+    
     @staticmethod
     async def get_all_categories(db: AsyncSession) -> List[Category]:
         """Get all categories for admin view"""
@@ -62,6 +78,7 @@ class CategoryService:
         
         db.add(category)
         await db.commit()
+        mark_primary_write()
         await db.refresh(category)
         return category
     
@@ -72,6 +89,7 @@ class CategoryService:
             delete(Category).where(Category.id == category_id)
         )
         await db.commit()
+        mark_primary_write()
         return result.rowcount > 0
     
     @staticmethod
@@ -0,0 +1,357 @@
+"""
+Drive Image Service
+===================
+Fetches Google Drive images for the image proxy through the two-tier
+image cache, so each file is downloaded from Drive once per variant.
+
+Upstream bodies are streamed straight through to the client: responses
+are validated from their headers and first bytes, then read into the
+cache by a background task that relays each chunk to the first client as
+it arrives. Requests waiting on the same fetch are released once the body
+is buffered, not when the first client has finished downloading it.
+
+Drive URL variants are hedged: if one is slow the next is started after
+a short delay, the first valid image wins and the rest are cancelled.
+The winning variant is remembered per file ID and tried first next time.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services.image_cache import ImageCache
+from app.services.image_store import sniff_content_type
+
+
+# Drive answers errors / interstitials with small HTML pages
+MIN_IMAGE_BYTES = 1000
+
+DEFAULT_VARIANT = "default"
+
+# How long a request waits for another request's in-flight fetch of the same image
+FLIGHT_WAIT_SECONDS = 30.0
+
+# file_id -> name of the Drive URL variant that worked last time
+MAX_VARIANT_HINTS = 4096
+variant_hints: "OrderedDict[str, str]" = OrderedDict()
+
+# Background tasks filling the cache from a leader's upstream fetch
+_fill_tasks: Set[asyncio.Task] = set()
+
+image_cache = ImageCache(
+    memory_bytes=settings.image_cache_memory_bytes,
+    disk_dir=settings.image_cache_dir,
+    disk_bytes=settings.image_cache_disk_bytes,
+)
+
+
+class ImageTooLarge(Exception):
+    """Upstream body exceeded image_proxy_max_bytes while streaming"""
+
+
+def drive_image_urls(file_id: str) -> List[Tuple[str, str]]:
+    """(variant name, URL) for each Google Drive URL format, last known good first"""
+    urls = [
+        ("download", f"https://drive.google.com/uc?export=download&id={file_id}"),
+        ("thumbnail", f"https://drive.google.com/thumbnail?id={file_id}&sz=w800"),
+        ("lh3", f"https://lh3.googleusercontent.com/d/{file_id}"),
+    ]
+    preferred = variant_hints.get(file_id)
+    if preferred:
+        urls.sort(key=lambda item: item[0] != preferred)
+    return urls
+
+
+def remember_variant(file_id: str, name: str) -> None:
+    variant_hints[file_id] = name
+    variant_hints.move_to_end(file_id)
+    while len(variant_hints) > MAX_VARIANT_HINTS:
+        variant_hints.popitem(last=False)
+
+
+def looks_like_html(head: bytes) -> bool:
+    """Drive sometimes serves HTML with an image content type"""
+    start = head[:64].lstrip().lower()
+    return start.startswith(b"<!doctype") or start.startswith(b"<html")
+
+
+class UpstreamImage:
+    """An upstream response opened in streaming mode and validated from its first bytes"""
+
+    def __init__(self, response: httpx.Response, iterator: AsyncIterator[bytes], head: bytes):
+        self.response = response
+        self.head = head
+        self._iterator = iterator
+        self.content_type = response.headers.get("content-type") or sniff_content_type(head)
+        length = response.headers.get("content-length")
+        # Content-Length is only meaningful when httpx does not decode the body
+        encoded = response.headers.get("content-encoding", "identity") != "identity"
+        self.content_length = int(length) if length and length.isdigit() and not encoded else None
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        """Relay the body, enforcing the size limit; closes the upstream response"""
+        try:
+            total = len(self.head)
+            yield self.head
+            async for chunk in self._iterator:
+                total += len(chunk)
+                if total > settings.image_proxy_max_bytes:
+                    raise ImageTooLarge(f"Image exceeds {settings.image_proxy_max_bytes} bytes")
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.response.aclose()
+
+
+async def open_image(client: httpx.AsyncClient, url: str) -> Optional[UpstreamImage]:
+    """
+    Start a streaming GET and validate it from headers and the first
+    bytes; returns None (with the response closed) if it is not an image
+    """
+    try:
+        response = await client.send(client.build_request("GET", url), stream=True)
+    except httpx.HTTPError:
+        return None
+
+    try:
+        content_type = response.headers.get("content-type", "")
+        length = response.headers.get("content-length")
+        if response.status_code != 200 or "text/html" in content_type:
+            await response.aclose()
+            return None
+        if length and length.isdigit() and int(length) > settings.image_proxy_max_bytes:
+            await response.aclose()
+            return None
+
+        # Read just enough to rule out error pages and truncated bodies
+        iterator = response.aiter_bytes()
+        head = b""
+        while len(head) <= MIN_IMAGE_BYTES:
+            try:
+                head += await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+        if len(head) <= MIN_IMAGE_BYTES or looks_like_html(head):
+            await response.aclose()
+            return None
+        return UpstreamImage(response, iterator, head)
+    except httpx.HTTPError:
+        await response.aclose()
+        return None
+    except BaseException:
+        await response.aclose()
+        raise
+
+
+async def open_hedged(
+    client: httpx.AsyncClient, urls: List[Tuple[str, str]], hedge_delay: float
+) -> Optional[Tuple[str, UpstreamImage]]:
+    """
+    Race candidate URLs: start the first, start the next whenever the
+    running ones fail or are slower than hedge_delay, keep the first
+    valid image and cancel the rest
+    Returns: (variant name, upstream) or None
+    """
+    candidates = iter(urls)
+    tasks: Dict[asyncio.Task, str] = {}
+
+    def launch_next() -> None:
+        candidate = next(candidates, None)
+        if candidate is not None:
+            name, url = candidate
+            tasks[asyncio.create_task(open_image(client, url))] = name
+
+    launch_next()
+    if hedge_delay <= 0:
+        for _ in urls[1:]:
+            launch_next()
+
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(
+                tasks, timeout=hedge_delay if hedge_delay > 0 else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # Slow candidate: hedge with the next one
+                launch_next()
+                continue
+            winner = None
+            for task in done:
+                name = tasks.pop(task)
+                upstream = None if task.exception() else task.result()
+                if upstream is None:
+                    launch_next()
+                elif winner is None:
+                    winner = (name, upstream)
+                else:
+                    await upstream.aclose()
+            if winner is not None:
+                return winner
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        # A loser may have finished just before being cancelled
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, UpstreamImage):
+                await result.aclose()
+
+
+class ProxiedImage:
+    """Either a cached body or a live upstream stream"""
+
+    def __init__(
+        self,
+        content_type: str,
+        body: Optional[bytes] = None,
+        chunks: Optional[AsyncGenerator[bytes, None]] = None,
+        content_length: Optional[int] = None,
+        cache_hit: bool = False,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.content_type = content_type
+        self.body = body
+        self.chunks = chunks
+        self.content_length = len(body) if body is not None else content_length
+        self.cache_hit = cache_hit
+        self._on_close = on_close
+
+    async def aclose(self) -> None:
+        """
+        Release the upstream stream whether or not the chunks were ever
+        iterated (a leader's cache fill finishes on its own); safe to call
+        more than once
+        """
+        if self.chunks is not None:
+            await self.chunks.aclose()
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            await on_close()
+
+
+class DriveImageService:
+    """Cached, streaming Google Drive image fetching"""
+
+    @staticmethod
+    async def open_from_drive(client: httpx.AsyncClient, file_id: str) -> Optional[UpstreamImage]:
+        """Hedged fetch across the Drive URL formats; remembers which one worked"""
+        winner = await open_hedged(
+            client, drive_image_urls(file_id), settings.image_proxy_hedge_delay
+        )
+        if winner is None:
+            return None
+        name, upstream = winner
+        remember_variant(file_id, name)
+        return upstream
+
+    @staticmethod
+    async def _fill_cache(key: str, upstream: UpstreamImage, relay: asyncio.Queue) -> None:
+        """
+        Read the whole upstream body into the cache, handing each chunk to
+        the leader's relay queue as it arrives. Runs as its own task, so
+        the flight is released as soon as the body is buffered, however
+        slowly (or whether) the leader's client reads it.
+        """
+        buffer = bytearray()
+        end: object = None
+        try:
+            async for chunk in upstream.iter_bytes():
+                buffer += chunk
+                relay.put_nowait(chunk)
+            await image_cache.put(key, (upstream.content_type, bytes(buffer)))
+        except (httpx.HTTPError, ImageTooLarge, OSError) as e:
+            end = e
+        except asyncio.CancelledError:
+            end = ConnectionError("Image fetch cancelled")
+            raise
+        except Exception as e:
+            # Unexpected: fail the leader's response and let the task report it
+            end = e
+            raise
+        finally:
+            image_cache.flights.finish(key)
+            await upstream.aclose()
+            relay.put_nowait(end)
+
+    @staticmethod
+    async def _relay(relay: asyncio.Queue) -> AsyncIterator[bytes]:
+        """Chunks from _fill_cache until its end marker (None, or the error to raise)"""
+        while True:
+            item = await relay.get()
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    @staticmethod
+    async def get_image(
+        client: httpx.AsyncClient, file_id: str, variant: str = DEFAULT_VARIANT
+    ) -> Optional[ProxiedImage]:
+        """
+        Get a Drive image from cache, or stream it from Drive. Concurrent
+        misses for the same file wait for the first fetch to fill the cache.
+        A streamed image must be aclose()d once the response is done.
+        """
+        key = f"drive:{file_id}:{variant}"
+        item = await image_cache.get(key)
+        if item is not None:
+            return ProxiedImage(item[0], body=item[1], cache_hit=True)
+
+        if not image_cache.flights.start(key):
+            await image_cache.flights.wait(key, timeout=FLIGHT_WAIT_SECONDS)
+            item = await image_cache.get(key)
+            if item is not None:
+                return ProxiedImage(item[0], body=item[1], cache_hit=True)
+            # The other fetch failed or was abandoned: fetch on our own, uncached
+            upstream = await DriveImageService.open_from_drive(client, file_id)
+            if upstream is None:
+                return None
+            return ProxiedImage(
+                upstream.content_type,
+                chunks=upstream.iter_bytes(),
+                content_length=upstream.content_length,
+                on_close=upstream.aclose,
+            )
+
+        image_cache.misses += 1
+        try:
+            upstream = await DriveImageService.open_from_drive(client, file_id)
+        except BaseException:
+            image_cache.flights.finish(key)
+            raise
+        if upstream is None:
+            image_cache.flights.finish(key)
+            return None
+        relay: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(DriveImageService._fill_cache(key, upstream, relay))
+        # Keep a reference: the loop only holds weak ones to running tasks
+        _fill_tasks.add(task)
+        task.add_done_callback(_fill_tasks.discard)
+        return ProxiedImage(
+            upstream.content_type,
+            chunks=DriveImageService._relay(relay),
+            content_length=upstream.content_length,
+        )
+
+    @staticmethod
+    async def get_image_bytes(client: httpx.AsyncClient, file_id: str) -> Optional[Tuple[str, bytes]]:
+        """Full body of a Drive image (e.g. as a resize source), filling the cache on a miss"""
+        image = await DriveImageService.get_image(client, file_id)
+        if image is None:
+            return None
+        if image.body is not None:
+            return image.content_type, image.body
+        try:
+            chunks = [chunk async for chunk in image.chunks]
+        except (httpx.HTTPError, ImageTooLarge):
+            return None
+        finally:
+            await image.aclose()
+        return image.content_type, b"".join(chunks)
@@ -0,0 +1,81 @@
+"""
+HTTP Clients
+============
+Shared, pooled httpx clients for upstream services (Google Drive,
+OpenRouter). Created once in the app lifespan so connections and TLS
+sessions are reused across requests instead of handshaking every time.
+"""
+
+import importlib.util
+import logging
+from typing import Dict
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DRIVE = "drive"
+OPENROUTER = "openrouter"
+EXTERNAL = "external"
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package"""
+    return settings.http2_enabled and importlib.util.find_spec("h2") is not None
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    options = {
+        DRIVE: {"follow_redirects": True, "timeout": httpx.Timeout(15.0, connect=5.0)},
+        OPENROUTER: {"base_url": OPENROUTER_BASE_URL, "timeout": httpx.Timeout(30.0, connect=5.0)},
+        EXTERNAL: {"follow_redirects": True, "timeout": httpx.Timeout(10.0, connect=5.0)},
+    }[name]
+    return httpx.AsyncClient(limits=limits, http2=http2_available(), **options)
+
+
+async def start_http_clients() -> None:
+    """Create one client per upstream (called from the app lifespan)"""
+    for name in (DRIVE, OPENROUTER, EXTERNAL):
+        if name not in _clients:
+            _clients[name] = _build_client(name)
+    logger.info("HTTP clients ready (http2=%s)", http2_available())
+
+
+async def close_http_clients() -> None:
+    """Close all clients and their pooled connections"""
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Get a shared client; created lazily when used outside the app lifespan"""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
+
+
+# ============== DEPENDENCIES ==============
+
+def get_drive_client() -> httpx.AsyncClient:
+    return get_http_client(DRIVE)
+
+
+def get_openrouter_client() -> httpx.AsyncClient:
+    return get_http_client(OPENROUTER)
+
+
+def get_external_client() -> httpx.AsyncClient:
+    return get_http_client(EXTERNAL)
@@ -0,0 +1,264 @@
+"""
+Image Cache
+===========
+Two-tier cache for proxied images: a byte-bounded in-memory LRU in
+front of a size-bounded disk cache, plus single-flight collapsing so
+concurrent misses for the same key share one upstream fetch.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (content_type, body)
+CachedImage = Tuple[str, bytes]
+
+
+class MemoryLRUCache:
+    """In-memory LRU bounded by total bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[str, CachedImage]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, item: CachedImage) -> None:
+        item_size = len(item[1])
+        if item_size > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old[1])
+        self._items[key] = item
+        self.size += item_size
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted[1])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DiskCache:
+    """
+    Directory of cached files bounded by total size.
+    Each file holds the content type on the first line followed by the body;
+    reads touch the mtime so eviction removes least recently used files first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        # Writes run in worker threads; serialize size accounting and eviction
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def _files(self):
+        try:
+            return [p for p in self.directory.iterdir() if p.is_file() and not p.name.startswith(".tmp-")]
+        except FileNotFoundError:
+            return []
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._files())
+        return self._size
+
+    def _read(self, key: str) -> Optional[CachedImage]:
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        content_type, _, body = raw.partition(b"\n")
+        return content_type.decode(), body
+
+    def _write(self, key: str, item: CachedImage) -> None:
+        content_type, body = item
+        payload = content_type.encode() + b"\n" + body
+        if len(payload) > self.max_bytes:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        with self._lock:
+            size = self._current_size()
+            if path.exists():
+                size -= path.stat().st_size
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._size = size + len(payload)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used files until under 90% of the limit"""
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for p in self._files():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        for _, file_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+                size -= file_size
+            except FileNotFoundError:
+                pass
+        self._size = size
+
+    async def get(self, key: str) -> Optional[CachedImage]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, item: CachedImage) -> None:
+        try:
+            await asyncio.to_thread(self._write, key, item)
+        except OSError as e:
+            logger.warning("Disk image cache write failed: %s", e)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent work for the same key: the caller whose start()
+    succeeds is the leader and must finish() the key; the others wait().
+    A flight not finished within max_age is treated as abandoned, so a
+    leader that never gets to finish() cannot block the key for good.
+    """
+
+    def __init__(self, max_age: float = 60.0):
+        self.max_age = max_age
+        # key -> (future, monotonic start time)
+        self._calls: Dict[str, Tuple[asyncio.Future, float]] = {}
+
+    def start(self, key: str) -> bool:
+        """Become the leader for key; False if a live call is already in flight"""
+        now = time.monotonic()
+        call = self._calls.get(key)
+        if call is not None and now - call[1] < self.max_age:
+            return False
+        if call is not None and not call[0].done():
+            # Abandoned: release its followers before taking over
+            call[0].set_result(None)
+        self._calls[key] = (asyncio.get_running_loop().create_future(), now)
+        return True
+
+    def finish(self, key: str, result=None) -> None:
+        """Release followers waiting on a call begun with start()"""
+        call = self._calls.pop(key, None)
+        if call is not None and not call[0].done():
+            call[0].set_result(result)
+
+    async def wait(self, key: str, timeout: Optional[float] = None):
+        """Wait for the in-flight call for key, if any; returns its result or None"""
+        call = self._calls.get(key)
+        if call is None:
+            return None
+        future, started = call
+        remaining = self.max_age - (time.monotonic() - started)
+        timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            return None
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class ImageCache:
+    """Memory LRU -> disk cache -> single-flight loader"""
+
+    def __init__(self, memory_bytes: int, disk_dir: str, disk_bytes: int):
+        self.memory = MemoryLRUCache(memory_bytes)
+        self.disk = DiskCache(disk_dir, disk_bytes) if disk_bytes > 0 else None
+        self.flights = SingleFlight()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[CachedImage]:
+        item = self.memory.get(key)
+        if item is not None:
+            self.memory_hits += 1
+            return item
+        if self.disk is not None:
+            item = await self.disk.get(key)
+            if item is not None:
+                self.disk_hits += 1
+                self.memory.put(key, item)
+                return item
+        return None
+
+    async def put(self, key: str, item: CachedImage) -> None:
+        self.memory.put(key, item)
+        if self.disk is not None:
+            await self.disk.put(key, item)
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Optional[CachedImage]]]
+    ) -> Tuple[Optional[CachedImage], bool]:
+        """
+        Return a cached item, or load it once for all concurrent callers
+        Returns: (item, cache_hit)
+        """
+        while True:
+            item = await self.get(key)
+            if item is not None:
+                return item, True
+            if self.flights.start(key):
+                break
+            # Another caller is loading it; on failure we try ourselves
+            await self.flights.wait(key)
+
+        try:
+            self.misses += 1
+            loaded = await loader()
+            if loaded is not None:
+                await self.put(key, loaded)
+            return loaded, False
+        finally:
+            self.flights.finish(key)
+
+    def stats(self) -> dict:
+        return {
+            "memoryEntries": len(self.memory),
+            "memoryBytes": self.memory.size,
+            "memoryMaxBytes": self.memory.max_bytes,
+            "diskMaxBytes": self.disk.max_bytes if self.disk else 0,
+            "memoryHits": self.memory_hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "inFlight": len(self.flights),
+        }
@@ -0,0 +1,208 @@
+"""
+Image Store
+===========
+Content-addressed blob storage for product images.
+Images are keyed by the SHA-256 of their decoded bytes, so identical
+uploads are stored once and product rows only hold the 64-char key.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Type
+
+from app.config import settings
+
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DATA_URL_PATTERN = re.compile(r"^data:([\w.+/-]*)((?:;[\w.+=-]+)*);base64,", re.IGNORECASE)
+
+
+def is_valid_key(key: str) -> bool:
+    """Check that a key looks like a SHA-256 hex digest"""
+    return bool(key and KEY_PATTERN.match(key))
+
+
+def sniff_content_type(data: bytes) -> str:
+    """Guess image MIME type from magic bytes"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return "application/octet-stream"
+
+
+def decode_data_url(value: str) -> Optional[bytes]:
+    """Decode a `data:...;base64,` URL, or None if value is not one"""
+    if not value:
+        return None
+    match = DATA_URL_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        return base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+class ImageStore:
+    """Base class for image blob backends"""
+
+    async def put(self, data: bytes) -> str:
+        """Store bytes and return their key"""
+        raise NotImplementedError
+
+    async def put_file(self, file: BinaryIO, key: str) -> str:
+        """
+        Store the contents of an open binary file whose key (SHA-256) is
+        already known; backends override this to avoid loading it into memory
+        """
+        def read() -> bytes:
+            file.seek(0)
+            return file.read()
+        return await self.put(await asyncio.to_thread(read))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get bytes by key, or None if missing"""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        """Check if a blob exists"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        """Delete a blob"""
+        raise NotImplementedError
+
+    @staticmethod
+    def compute_key(data: bytes) -> str:
+        """Content address for a blob"""
+        return hashlib.sha256(data).hexdigest()
+
+
+class LocalImageStore(ImageStore):
+    """Filesystem backend: <root>/ab/cd/abcd... (sharded to keep directories small)"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self.path_for(key)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _copy_file(self, key: str, source: BinaryIO) -> None:
+        path = self.path_for(key)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            source.seek(0)
+            with os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(source, dst, 1024 * 1024)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            return self.path_for(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, key: str) -> bool:
+        try:
+            self.path_for(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def put(self, data: bytes) -> str:
+        key = self.compute_key(data)
+        await asyncio.to_thread(self._write, key, data)
+        return key
+
+    async def put_file(self, file: BinaryIO, key: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid image key: {key}")
+        await asyncio.to_thread(self._copy_file, key, file)
+        return key
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not is_valid_key(key):
+            return None
+        return await asyncio.to_thread(self._read, key)
+
+    async def exists(self, key: str) -> bool:
+        if not is_valid_key(key):
+            return False
+        return await asyncio.to_thread(self.path_for(key).exists)
+
+    async def delete(self, key: str) -> bool:
+        if not is_valid_key(key):
+            return False
+        return await asyncio.to_thread(self._delete, key)
+
+
+IMAGE_STORE_BACKENDS: Dict[str, Type[ImageStore]] = {
+    "local": LocalImageStore,
+}
+
+
+@lru_cache()
+def get_image_store() -> ImageStore:
+    """Get the configured image store backend"""
+    backend = IMAGE_STORE_BACKENDS.get(settings.image_store_backend)
+    if backend is None:
+        raise ValueError(f"Unknown image store backend: {settings.image_store_backend}")
+    return backend(settings.image_store_path)
+
+
+async def ingest_image_data(image_data: str) -> tuple[str, str]:
+    """
+    Move inline base64 image data into the blob store
+    Returns: (image_key, image_data) - data URLs become a key, other
+    values (e.g. Google Drive URLs) are kept as-is
+    """
+    data = decode_data_url(image_data)
+    if data is None:
+        return "", image_data or ""
+    key = await get_image_store().put(data)
+    return key, ""
+
+
+async def read_image_bytes(image_key: str, image_data: str) -> Optional[bytes]:
+    """Load product image bytes from the blob store or a legacy data URL"""
+    if image_key:
+        return await get_image_store().get(image_key)
+    return decode_data_url(image_data)
@@ -0,0 +1,258 @@
+"""
+Image Variants
+==============
+Width-bounded WebP/JPEG derivatives of product images for grid tiles
+and thumbnails. Resizing runs in a process pool so the event loop is
+never blocked, and results are cached by source hash (or Drive file ID)
++ width + format.
+The same pool downscales images before they are sent to the vision model.
+
+Requires Pillow; without it the original image is served unchanged.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from app.config import settings
+from app.services.drive_images import DriveImageService
+from app.services.image_cache import CachedImage, ImageCache
+from app.services.image_store import get_image_store, sniff_content_type
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (200, 400, 800)
+
+VARIANT_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+variant_cache = ImageCache(
+    memory_bytes=settings.image_variant_cache_memory_bytes,
+    disk_dir=settings.image_variant_cache_dir,
+    disk_bytes=settings.image_variant_cache_disk_bytes,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _render(source, width: int, fmt: str, quality: int) -> bytes:
+    img = source
+    if img.width > width:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+    if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    elif fmt == "webp" and img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    out = io.BytesIO()
+    img.save(out, format=fmt.upper(), quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def resize_image(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """Downscale to at most `width` pixels wide and re-encode (runs in a worker process)"""
+    with Image.open(io.BytesIO(data)) as source:
+        return _render(ImageOps.exif_transpose(source), width, fmt, quality)
+
+
+def resize_variants(
+    data: bytes, variants: List[Tuple[int, str]], quality: int
+) -> Dict[Tuple[int, str], bytes]:
+    """Several (width, format) variants from one decode (runs in a worker process)"""
+    with Image.open(io.BytesIO(data)) as source:
+        img = ImageOps.exif_transpose(source)
+        img.load()
+        return {(width, fmt): _render(img, width, fmt, quality) for width, fmt in variants}
+
+
+def _load_source(source: Union[bytes, str]) -> bytes:
+    """Image bytes, or a path to read them from (avoids pickling large uploads)"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source
+
+
+def encode_original(source: Union[bytes, str]) -> Tuple[str, str]:
+    """(base64, MIME type) of an image as-is, sniffing its real type"""
+    data = _load_source(source)
+    mime = sniff_content_type(data)
+    if mime == "application/octet-stream":
+        mime = "image/jpeg"
+    return base64.b64encode(data).decode("ascii"), mime
+
+
+def prepare_vision_image(source: Union[bytes, str], max_side: int, quality: int) -> Tuple[str, str]:
+    """
+    Fit an image within max_side x max_side, re-encode as JPEG and return
+    (base64, MIME type); falls back to the original if it cannot be decoded
+    (runs in a worker process)
+    """
+    data = _load_source(source)
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=quality, optimize=True)
+    except Exception:
+        return encode_original(data)
+    encoded = out.getvalue()
+    if len(encoded) >= len(data) and sniff_content_type(data) != "application/octet-stream":
+        # Already small and in a format the model accepts
+        return encode_original(data)
+    return base64.b64encode(encoded).decode("ascii"), "image/jpeg"
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Process pool for image work, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.image_worker_processes)
+    return _executor
+
+
+def shutdown_image_workers() -> None:
+    """Stop the process pool (called from the app lifespan)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_in_image_worker(fn, *args):
+    """Run a picklable function in the image process pool"""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+
+
+class ImageVariantService:
+    """Resized image derivatives with caching"""
+
+    @staticmethod
+    def is_available() -> bool:
+        return Image is not None
+
+    @staticmethod
+    def pick_format(accept: str) -> str:
+        """WebP for clients that accept it, JPEG otherwise"""
+        return "webp" if "image/webp" in (accept or "") else "jpeg"
+
+    @staticmethod
+    def normalize_width(width: int) -> int:
+        """Snap a requested width to the smallest variant that covers it"""
+        for candidate in VARIANT_WIDTHS:
+            if width <= candidate:
+                return candidate
+        return VARIANT_WIDTHS[-1]
+
+    @staticmethod
+    async def get_variant(
+        source: bytes, width: int, fmt: str, source_hash: Optional[str] = None
+    ) -> CachedImage:
+        """
+        Get a resized variant of source bytes, rendering it once
+        Returns: (content_type, body)
+        """
+        source_hash = source_hash or hashlib.sha256(source).hexdigest()
+        width = ImageVariantService.normalize_width(width)
+
+        async def render() -> CachedImage:
+            body = await run_in_image_worker(
+                resize_image, source, width, fmt, settings.image_variant_quality
+            )
+            return VARIANT_FORMATS[fmt], body
+
+        item, _ = await variant_cache.get_or_load(
+            ImageVariantService.variant_key(source_hash, width, fmt), render
+        )
+        return item
+
+    @staticmethod
+    def variant_key(source_hash: str, width: int, fmt: str) -> str:
+        return f"{source_hash}:{ImageVariantService.normalize_width(width)}:{fmt}"
+
+    @staticmethod
+    async def get_stored_variant(image_key: str, width: int, fmt: str) -> Optional[CachedImage]:
+        """Variant of an image-store blob; the blob is only read on a cache miss"""
+        cached = await variant_cache.get(ImageVariantService.variant_key(image_key, width, fmt))
+        if cached is not None:
+            return cached
+        source = await get_image_store().get(image_key)
+        if source is None:
+            return None
+        return await ImageVariantService.get_variant(source, width, fmt, source_hash=image_key)
+
+    @staticmethod
+    async def get_drive_variant(
+        client: httpx.AsyncClient, file_id: str, width: int, fmt: str
+    ) -> Optional[CachedImage]:
+        """Variant of a Google Drive image; the original is only fetched on a cache miss"""
+        source_key = f"drive:{file_id}"
+        cached = await variant_cache.get(ImageVariantService.variant_key(source_key, width, fmt))
+        if cached is not None:
+            return cached
+        item = await DriveImageService.get_image_bytes(client, file_id)
+        if item is None:
+            return None
+        return await ImageVariantService.get_variant(item[1], width, fmt, source_hash=source_key)
+
+    @staticmethod
+    async def encode_for_vision(source: Union[bytes, str]) -> Tuple[str, str]:
+        """
+        Downscaled, recompressed base64 of an image (bytes or file path)
+        for the vision model, encoded in the image process pool
+        Returns: (base64, MIME type)
+        """
+        if not ImageVariantService.is_available():
+            return await asyncio.to_thread(encode_original, source)
+        return await run_in_image_worker(
+            prepare_vision_image,
+            source,
+            settings.vision_image_max_side,
+            settings.vision_image_quality,
+        )
+    
+    @staticmethod
+    async def pregenerate(image_key: str) -> None:
+        """
+        Render every missing variant of a stored image ahead of the first
+        request: one blob read and one worker call for all of them
+        """
+        if not ImageVariantService.is_available() or not image_key:
+            return
+        try:
+            missing = []
+            for width in VARIANT_WIDTHS:
+                for fmt in VARIANT_FORMATS:
+                    if await variant_cache.get(ImageVariantService.variant_key(image_key, width, fmt)) is None:
+                        missing.append((width, fmt))
+            if not missing:
+                return
+            source = await get_image_store().get(image_key)
+            if source is None:
+                return
+            rendered = await run_in_image_worker(
+                resize_variants, source, missing, settings.image_variant_quality
+            )
+            for (width, fmt), body in rendered.items():
+                await variant_cache.put(
+                    ImageVariantService.variant_key(image_key, width, fmt), (VARIANT_FORMATS[fmt], body)
+                )
+        except Exception as e:
+            logger.warning("Variant pregeneration failed for %s: %s", image_key, e)
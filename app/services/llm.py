@@ -6,8 +6,14 @@ OpenRouter integration for AI-powered product descriptions
 
 import httpx
 import base64
-from typing import Optional
+import hashlib
+import json
+import time
+from typing import AsyncIterator, Optional
 from app.config import settings
+from app.services.http_clients import OPENROUTER, get_http_client
+from app.services.llm_cache import description_cache_key, llm_cache
+from app.services.llm_router import model_router
 
 
 class LLMService:
@@ -26,25 +32,63 @@ class LLMService:
     
     DEFAULT_MODEL = "nvidia/nemotron-nano-12b-v2-vl:free"
     
+    # Relative to the shared OpenRouter client's base URL
+    CHAT_COMPLETIONS_PATH = "/chat/completions"
+    
+    # Bump when the description prompt changes so cached descriptions are not reused
+    PROMPT_VERSION = 1
+    
+    # Cache key "model" for descriptions produced by model routing
+    ROUTED_MODEL = "auto"
+    
     @staticmethod
-    async def generate_description(
+    def routed_models(model: Optional[str] = None) -> list[str]:
+        """Models to try: just `model` if given, else DEFAULT_MODEL then the other free models"""
+        if model:
+            return [model]
+        return [LLMService.DEFAULT_MODEL] + [
+            m for m in LLMService.FREE_MODELS if m != LLMService.DEFAULT_MODEL
+        ]
+    
+    @staticmethod
+    def error_message(response: Optional[httpx.Response], error: str) -> str:
+        """User-facing message for a failed completion"""
+        if response is None or response.status_code == 200:
+            return f"LLM generation failed: {error}"
+        if response.status_code == 429:
+            return "Rate limit exceeded. Please wait a few minutes or add credits to your OpenRouter account."
+        if response.status_code == 401:
+            return "Invalid API key. Please check your OPENROUTER_API_KEY in .env file."
+        return f"OpenRouter API error: {response.status_code}"
+    
+    @staticmethod
+    def model_stats() -> list[dict]:
+        """Circuit breaker and latency stats of the routed models (this process)"""
+        return model_router.stats(LLMService.routed_models())
+    
+    @staticmethod
+    def description_cache_key(
         image_base64: str,
+        image_hash: Optional[str],
         product_name: str,
         category: str,
-        model: Optional[str] = None
-    ) -> tuple[str, str]:
+        model: Optional[str] = None,
+    ) -> str:
+        return description_cache_key(
+            image_hash or hashlib.sha256(image_base64.encode()).hexdigest(),
+            product_name, category, model or LLMService.ROUTED_MODEL, LLMService.PROMPT_VERSION,
+        )
+    
+    @staticmethod
+    def description_request(
+        image_base64: str, product_name: str, category: str, image_mime: str = "image/jpeg"
+    ) -> tuple[dict, dict]:
         """
-        Generate product description from image using OpenRouter
-        Returns: (description, error_message)
+        Headers and chat payload (without "model") for a description request
+        Returns: (headers, payload)
         """
-        if not settings.openrouter_api_key:
-            return "", "OpenRouter API key not configured"
-        
-        try:
-            model = model or LLMService.DEFAULT_MODEL
-            
-            # Prepare the prompt
-            prompt = f"""You are an expert fashion copywriter for a premium textile e-commerce store.
+        # Prepare the prompt
+        prompt = f"""You are an expert fashion copywriter for a premium textile e-commerce store.
 
 Product: {product_name}
 Category: {category}
@@ -63,66 +107,202 @@ Length: 120-180 words.
 
 IMPORTANT: Base your description ONLY on what you actually see in the image. Be specific and descriptive about visible details like patterns, colors, textures, cuts, and style elements."""
 
-            # Prepare the request
-            headers = {
-                "Authorization": f"Bearer {settings.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://mohana-textiles.com",  # Optional
-                "X-Title": "Mohana Textiles",  # Optional
+        # Prepare the request
+        headers = {
+            "Authorization": f"Bearer {settings.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://mohana-textiles.com",  # Optional
+            "X-Title": "Mohana Textiles",  # Optional
+        }
+        
+        # Build message with image
+        content = [
+            {"type": "text", "text": prompt},
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{image_mime};base64,{image_base64}"
+                }
             }
-            
-            # Build message with image
-            content = [
-                {"type": "text", "text": prompt},
+        ]
+        
+        payload = {
+            "messages": [
                 {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_base64}"
-                    }
+                    "role": "user",
+                    "content": content
                 }
-            ]
+            ],
+            "max_tokens": 300,
+            "temperature": 0.7,
+        }
+        return headers, payload
+    
+    @staticmethod
+    async def generate_description(
+        image_base64: str,
+        product_name: str,
+        category: str,
+        model: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        image_hash: Optional[str] = None,
+        use_cache: bool = True,
+        image_mime: str = "image/jpeg"
+    ) -> tuple[str, str]:
+        """
+        Generate product description from image using OpenRouter
+        Returns: (description, error_message)
+        """
+        description, error, _ = await LLMService.generate_description_with_model(
+            image_base64, product_name, category, model, client, image_hash, use_cache, image_mime
+        )
+        return description, error
+    
+    @staticmethod
+    async def generate_description_with_model(
+        image_base64: str,
+        product_name: str,
+        category: str,
+        model: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        image_hash: Optional[str] = None,
+        use_cache: bool = True,
+        image_mime: str = "image/jpeg"
+    ) -> tuple[str, str, str]:
+        """
+        Generate product description from image using OpenRouter.
+        Without an explicit `model`, requests fail over across FREE_MODELS
+        (see llm_router). Results are cached by image hash, name, category,
+        model and prompt version; `use_cache=False` skips the lookup (but
+        still stores).
+        Returns: (description, error_message, model used)
+        """
+        cache_key = LLMService.description_cache_key(
+            image_base64, image_hash, product_name, category, model
+        )
+        if use_cache:
+            cached = await llm_cache.get(cache_key)
+            if cached:
+                return cached, "", model or ""
+        
+        if not settings.openrouter_api_key:
+            return "", "OpenRouter API key not configured", ""
+        
+        try:
+            headers, payload = LLMService.description_request(
+                image_base64, product_name, category, image_mime
+            )
             
-            payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
-                "max_tokens": 300,
-                "temperature": 0.7,
-            }
+            client = client or get_http_client(OPENROUTER)
+            data, response, used_model, error = await model_router.post_chat(
+                client,
+                LLMService.CHAT_COMPLETIONS_PATH,
+                headers,
+                payload,
+                LLMService.routed_models(model),
+            )
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    description = data["choices"][0]["message"]["content"].strip()
-                    return description, ""
-                elif response.status_code == 429:
-                    error_msg = "Rate limit exceeded. Please wait a few minutes or add credits to your OpenRouter account."
-                    return "", error_msg
-                elif response.status_code == 401:
-                    error_msg = "Invalid API key. Please check your OPENROUTER_API_KEY in .env file."
-                    return "", error_msg
-                else:
-                    error_msg = f"OpenRouter API error: {response.status_code}"
-                    return "", error_msg
+            if data is None:
+                return "", LLMService.error_message(response, error), used_model
+            
+            description = data["choices"][0]["message"]["content"].strip()
+            await llm_cache.set(cache_key, description, used_model, LLMService.PROMPT_VERSION)
+            return description, "", used_model
                     
         except Exception as e:
-            return "", f"LLM generation failed: {str(e)}"
+            return "", f"LLM generation failed: {str(e)}", ""
+    
+    @staticmethod
+    async def stream_description(
+        image_base64: str,
+        product_name: str,
+        category: str,
+        model: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        image_hash: Optional[str] = None,
+        use_cache: bool = True,
+        image_mime: str = "image/jpeg"
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Stream a description from OpenRouter (`stream: true`) as events:
+        ("token", {"text"}) for each delta, then ("done", {"description",
+        "model"}) or ("error", {"error"}). A cached description is sent as
+        a single token.
+        """
+        cache_key = LLMService.description_cache_key(
+            image_base64, image_hash, product_name, category, model
+        )
+        if use_cache:
+            cached = await llm_cache.get(cache_key)
+            if cached:
+                yield "token", {"text": cached}
+                yield "done", {"description": cached, "model": model or ""}
+                return
+        
+        if not settings.openrouter_api_key:
+            yield "error", {"error": "OpenRouter API key not configured"}
+            return
+        
+        headers, payload = LLMService.description_request(
+            image_base64, product_name, category, image_mime
+        )
+        client = client or get_http_client(OPENROUTER)
+        started = time.monotonic()
+        response, failed, used_model, error = await model_router.open_stream(
+            client,
+            LLMService.CHAT_COMPLETIONS_PATH,
+            headers,
+            payload,
+            LLMService.routed_models(model),
+        )
+        if response is None:
+            yield "error", {"error": LLMService.error_message(failed, error)}
+            return
+        
+        parts = []
+        error = ""
+        try:
+            async for line in response.aiter_lines():
+                # SSE: "data: {...}" lines; ":" comments are keep-alives
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in chunk:
+                    error = str(chunk["error"].get("message", chunk["error"]))
+                    break
+                choices = chunk.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content") or ""
+                if text:
+                    parts.append(text)
+                    yield "token", {"text": text}
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            await response.aclose()
+        
+        description = "".join(parts).strip()
+        if not error and not description:
+            error = "Empty completion"
+        model_router.record_stream(used_model, time.monotonic() - started, error)
+        if error:
+            yield "error", {"error": f"LLM generation failed: {error}"}
+            return
+        
+        await llm_cache.set(cache_key, description, used_model, LLMService.PROMPT_VERSION)
+        yield "done", {"description": description, "model": used_model}
     
     @staticmethod
     async def enhance_description(
         current_description: str,
         product_name: str,
-        category: str
+        category: str,
+        client: Optional[httpx.AsyncClient] = None
     ) -> tuple[str, str]:
         """
         Enhance existing product description without image
@@ -147,7 +327,6 @@ IMPORTANT: Base your description ONLY on what you actually see in the image. Be
             }
             
             payload = {
-                "model": LLMService.DEFAULT_MODEL,
                 "messages": [
                     {"role": "user", "content": prompt}
                 ],
@@ -155,19 +334,22 @@ IMPORTANT: Base your description ONLY on what you actually see in the image. Be
                 "temperature": 0.7,
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    enhanced = data["choices"][0]["message"]["content"].strip()
-                    return enhanced, ""
-                else:
-                    return current_description, f"API error: {response.status_code}"
+            client = client or get_http_client(OPENROUTER)
+            data, response, _, error = await model_router.post_chat(
+                client,
+                LLMService.CHAT_COMPLETIONS_PATH,
+                headers,
+                payload,
+                LLMService.routed_models(),
+            )
+            
+            if data is not None:
+                enhanced = data["choices"][0]["message"]["content"].strip()
+                return enhanced, ""
+            elif response is not None:
+                return current_description, f"API error: {response.status_code}"
+            else:
+                return current_description, f"Enhancement failed: {error}"
                     
         except Exception as e:
             return current_description, f"Enhancement failed: {str(e)}"
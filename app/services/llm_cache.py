@@ -0,0 +1,122 @@
+"""
+LLM Description Cache
+=====================
+Persistent cache of AI-generated descriptions keyed by a hash of
+(image hash, product name, category, model, prompt version), stored in
+the database so every worker process shares it. Entries expire after
+llm_cache_ttl_seconds; the oldest are evicted beyond llm_cache_max_entries.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.llm_cache import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Expired / excess entries are pruned once every this many writes
+PRUNE_EVERY_WRITES = 50
+
+
+def description_cache_key(
+    image_hash: str, product_name: str, category: str, model: str, prompt_version: int
+) -> str:
+    raw = json.dumps([image_hash, product_name.strip(), category.strip(), model, prompt_version])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class LLMCache:
+    """Database-backed description cache; failures are logged, never raised"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.llm_cache_ttl_seconds > 0
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(LLMCacheEntry.description).where(
+                        LLMCacheEntry.key == key,
+                        LLMCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+                description = result.scalar_one_or_none()
+        except Exception as e:
+            logger.warning("LLM cache read failed: %s", e)
+            return None
+        if description is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return description
+
+    async def set(self, key: str, description: str, model: str, prompt_version: int) -> None:
+        if not self.enabled or not description:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.llm_cache_ttl_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(LLMCacheEntry(
+                    key=key,
+                    description=description,
+                    model=model,
+                    prompt_version=prompt_version,
+                    expires_at=expires_at,
+                ))
+                await db.commit()
+                self.writes += 1
+                if self.writes % PRUNE_EVERY_WRITES == 0:
+                    await self.prune(db)
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    async def prune(self, db) -> int:
+        """Delete expired entries, then the oldest beyond llm_cache_max_entries"""
+        result = await db.execute(
+            delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= datetime.now(timezone.utc))
+        )
+        removed = result.rowcount or 0
+
+        count = (await db.execute(select(func.count(LLMCacheEntry.key)))).scalar() or 0
+        excess = count - settings.llm_cache_max_entries
+        if excess > 0:
+            oldest = (
+                select(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.created_at)
+                .limit(excess)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+            removed += result.rowcount or 0
+        await db.commit()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+llm_cache = LLMCache()
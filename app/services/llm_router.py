@@ -0,0 +1,238 @@
+"""
+LLM Model Router
+================
+Failover across OpenRouter models. Each model has a circuit breaker:
+after repeated failures, or any 429 / Retry-After, it is skipped for an
+exponentially growing cool-down. Available models are tried in order of
+recently observed success rate and latency.
+"""
+
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor for the latency / success moving averages
+EWMA_ALPHA = 0.2
+
+# Latency assumed for models that have not answered yet (seconds)
+INITIAL_LATENCY = 5.0
+
+# Consecutive failures that open a breaker (429s open it at once)
+FAILURE_THRESHOLD = 3
+
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 600.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelHealth:
+    """Circuit breaker and moving averages for one model"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.success_rate = 1.0
+        self.latency = INITIAL_LATENCY
+        self.open_until = 0.0
+        self.last_error = ""
+
+    def available(self, now: float) -> bool:
+        return now >= self.open_until
+
+    def score(self) -> float:
+        """Higher is better: success rate per second of latency"""
+        return self.success_rate / max(self.latency, 0.1)
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.success_rate += EWMA_ALPHA * (1.0 - self.success_rate)
+        self.latency += EWMA_ALPHA * (latency - self.latency)
+
+    def record_failure(self, error: str, retry_after: Optional[float] = None, rate_limited: bool = False) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.success_rate -= EWMA_ALPHA * self.success_rate
+        if rate_limited or retry_after is not None or self.consecutive_failures >= FAILURE_THRESHOLD:
+            backoff = min(
+                BACKOFF_BASE_SECONDS * 2 ** (self.consecutive_failures - 1),
+                BACKOFF_MAX_SECONDS,
+            )
+            if retry_after is not None:
+                backoff = max(backoff, min(retry_after, BACKOFF_MAX_SECONDS))
+            self.open_until = time.monotonic() + backoff
+
+    def stats(self, now: float) -> dict:
+        return {
+            "model": self.model,
+            "available": self.available(now),
+            "cooldownSeconds": round(max(0.0, self.open_until - now), 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutiveFailures": self.consecutive_failures,
+            "successRate": round(self.success_rate, 3),
+            "latencySeconds": round(self.latency, 2),
+            "lastError": self.last_error,
+        }
+
+
+class ModelRouter:
+    """Orders models by health and fails over between them"""
+
+    def __init__(self):
+        self._health: Dict[str, ModelHealth] = {}
+
+    def health(self, model: str) -> ModelHealth:
+        state = self._health.get(model)
+        if state is None:
+            state = self._health[model] = ModelHealth(model)
+        return state
+
+    def candidates(self, models: Sequence[str]) -> List[str]:
+        """Models with a closed breaker, best first (list order breaks ties)"""
+        now = time.monotonic()
+        available = [m for m in models if self.health(m).available(now)]
+        return sorted(available, key=lambda m: -self.health(m).score())
+
+    async def post_chat(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        headers: dict,
+        payload: dict,
+        models: Sequence[str],
+    ) -> Tuple[Optional[dict], Optional[httpx.Response], str, str]:
+        """
+        POST a chat completion, failing over through the candidate models
+        Returns: (response JSON, last response, model, error) - the JSON is
+        None when every attempt failed
+        """
+        candidates = self.candidates(models)[: max(1, settings.llm_failover_attempts)]
+        if not candidates:
+            return None, None, "", "All models are cooling down after errors"
+
+        response = None
+        error = ""
+        for model in candidates:
+            state = self.health(model)
+            started = time.monotonic()
+            try:
+                response = await client.post(path, headers=headers, json={**payload, "model": model})
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                state.record_failure(error)
+                logger.warning("LLM model %s failed: %s", model, error)
+                continue
+
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    data["choices"][0]["message"]["content"]
+                except (ValueError, KeyError, IndexError, TypeError):
+                    error = "Malformed completion"
+                    state.record_failure(error)
+                    continue
+                state.record_success(time.monotonic() - started)
+                return data, response, model, ""
+
+            error = f"HTTP {response.status_code}"
+            if response.status_code == 401:
+                # Same key for every model: failing over would not help
+                return None, response, model, error
+            # 429, 5xx, unknown model...: specific to this model, try the next one
+            state.record_failure(
+                error,
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+                rate_limited=response.status_code == 429,
+            )
+            logger.warning("LLM model %s failed: %s", model, error)
+
+        return None, response, candidates[-1], error
+
+    async def open_stream(
+        self,
+        client: httpx.AsyncClient,
+        path: str,
+        headers: dict,
+        payload: dict,
+        models: Sequence[str],
+    ) -> Tuple[Optional[httpx.Response], Optional[httpx.Response], str, str]:
+        """
+        Open a streaming chat completion, failing over until one model
+        answers 200. Failover is only possible before the first token, so
+        the caller records the outcome with record_stream() and must close
+        the returned response.
+        Returns: (open stream, last failed response, model, error)
+        """
+        candidates = self.candidates(models)[: max(1, settings.llm_failover_attempts)]
+        if not candidates:
+            return None, None, "", "All models are cooling down after errors"
+
+        failed = None
+        error = ""
+        for model in candidates:
+            state = self.health(model)
+            request = client.build_request(
+                "POST", path, headers=headers, json={**payload, "model": model, "stream": True}
+            )
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                state.record_failure(error)
+                logger.warning("LLM model %s failed: %s", model, error)
+                continue
+            if response.status_code == 200:
+                return response, None, model, ""
+
+            await response.aclose()
+            failed = response
+            error = f"HTTP {response.status_code}"
+            if response.status_code == 401:
+                return None, failed, model, error
+            state.record_failure(
+                error,
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+                rate_limited=response.status_code == 429,
+            )
+            logger.warning("LLM model %s failed: %s", model, error)
+
+        return None, failed, candidates[-1], error
+
+    def record_stream(self, model: str, latency: float, error: str = "") -> None:
+        """Outcome of a stream opened with open_stream()"""
+        if error:
+            self.health(model).record_failure(error)
+        else:
+            self.health(model).record_success(latency)
+
+    def stats(self, models: Sequence[str]) -> List[dict]:
+        now = time.monotonic()
+        return [self.health(m).stats(now) for m in models]
+
+
+model_router = ModelRouter()
@@ -0,0 +1,159 @@
+"""
+Password Hashing
+================
+Salted, tunable password hashes built on the standard library KDFs.
+
+Hashes are self-describing strings, so cost parameters can be raised
+without invalidating existing passwords:
+
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+Legacy unsalted SHA-256 hex digests still verify and are reported by
+needs_rehash() so they get upgraded on the next successful login.
+Hashing is CPU-bound, so the async helpers run it in a small dedicated
+thread pool (hashlib releases the GIL) instead of on the event loop.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+
+PASSWORD_ALGORITHMS = ("scrypt", "pbkdf2_sha256")
+
+# Fail at startup, not on the first login or password change
+if settings.password_hash_algorithm not in PASSWORD_ALGORITHMS:
+    raise ValueError(
+        f"Unknown PASSWORD_HASH_ALGORITHM {settings.password_hash_algorithm!r}, "
+        f"expected one of {', '.join(PASSWORD_ALGORITHMS)}"
+    )
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+LEGACY_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Verified against when the account does not exist, so a login for an
+# unknown email costs about the same as one with a wrong password
+_DUMMY_PASSWORD = secrets.token_urlsafe(16)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # 128 * r * n bytes of working memory, plus headroom over OpenSSL's 32 MB default
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * r * n + 1024 * 1024, dklen=KEY_BYTES,
+    )
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def hash_password(
+    password: str,
+    algorithm: Optional[str] = None,
+    scrypt_n: Optional[int] = None,
+    scrypt_r: Optional[int] = None,
+    scrypt_p: Optional[int] = None,
+    pbkdf2_iterations: Optional[int] = None,
+) -> str:
+    """Hash a password with the configured (or given) algorithm and cost"""
+    algorithm = algorithm or settings.password_hash_algorithm
+    salt = secrets.token_bytes(SALT_BYTES)
+    if algorithm == "scrypt":
+        n = scrypt_n or settings.password_scrypt_n
+        r = scrypt_r or settings.password_scrypt_r
+        p = scrypt_p or settings.password_scrypt_p
+        key = _scrypt(password, salt, n, r, p)
+        return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+    if algorithm == "pbkdf2_sha256":
+        iterations = pbkdf2_iterations or settings.password_pbkdf2_iterations
+        key = _pbkdf2(password, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(key)}"
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against any supported hash format (constant-time compare)"""
+    if LEGACY_SHA256_PATTERN.match(password_hash):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash)
+
+    parts = password_hash.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            key = _scrypt(password, _b64decode(parts[4]), n, r, p)
+            return hmac.compare_digest(key, _b64decode(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            key = _pbkdf2(password, _b64decode(parts[2]), int(parts[1]))
+            return hmac.compare_digest(key, _b64decode(parts[3]))
+    except ValueError:
+        pass
+    return False
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True for legacy hashes or hashes made with other than the current settings"""
+    parts = password_hash.split("$")
+    algorithm = settings.password_hash_algorithm
+    if parts[0] != algorithm:
+        return True
+    if algorithm == "scrypt":
+        current = [str(settings.password_scrypt_n), str(settings.password_scrypt_r), str(settings.password_scrypt_p)]
+        return parts[1:4] != current
+    return parts[1:2] != [str(settings.password_pbkdf2_iterations)]
+
+
+@lru_cache()
+def _dummy_hash() -> str:
+    return hash_password(_DUMMY_PASSWORD)
+
+
+def _dummy_verify() -> bool:
+    return verify_password(_DUMMY_PASSWORD, _dummy_hash())
+
+
+@lru_cache()
+def _executor() -> ThreadPoolExecutor:
+    # Bounded so a burst of logins cannot take every core (or scrypt's memory)
+    return ThreadPoolExecutor(
+        max_workers=max(1, settings.password_hash_workers),
+        thread_name_prefix="password-hash",
+    )
+
+
+async def warm_up() -> None:
+    """Compute the dummy hash at startup so the first unknown-email login is not slower"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor(), _dummy_hash)
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: Optional[str]) -> bool:
+    """Verify off the event loop; with no hash, burn equivalent time and fail"""
+    loop = asyncio.get_running_loop()
+    if password_hash is None:
+        await loop.run_in_executor(_executor(), _dummy_verify)
+        return False
+    return await loop.run_in_executor(_executor(), verify_password, password, password_hash)
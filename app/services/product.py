@@ -4,13 +4,149 @@ Product Service
 Business logic for product operations
 """
 
-from typing import List, Optional
+import base64
+import binascii
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import String, any_, bindparam, select, insert, update, delete, literal, true, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import func
 
-from app.models.product import Product
+from app.config import settings
+from app.database import mark_primary_write
+from app.models.product import Product, product_image_url, product_thumbnail_url
 from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.cache import TTLCache
+from app.services.http_cache import make_etag
+from app.services.image_store import ingest_image_data
+from app.services.product_import import IMPORT_BATCH_SIZE, ImportRow
+
+logger = logging.getLogger(__name__)
+
+
+# Public catalog reads, invalidated by product ID and category on every write
+catalog_cache = TTLCache(
+    max_entries=settings.catalog_cache_max_entries,
+    ttl_seconds=settings.catalog_cache_ttl_seconds,
+)
+
+# Tag for cache entries that span all categories
+ALL_PRODUCTS_TAG = "products:all"
+
+
+def product_tag(product_id: str) -> str:
+    return f"product:{product_id}"
+
+
+def category_tag(category: Optional[str]) -> str:
+    return f"category:{category}" if category else ALL_PRODUCTS_TAG
+
+
+# Public API field name -> (columns to select, builder from a row mapping)
+PRODUCT_FIELDS = {
+    "id": ((Product.id,), lambda r: r["id"]),
+    "name": ((Product.name,), lambda r: r["name"]),
+    "category": ((Product.category,), lambda r: r["category"]),
+    "price": ((Product.price,), lambda r: r["price"]),
+    "discount": ((Product.discount,), lambda r: r["discount"]),
+    "finalPrice": ((Product.final_price,), lambda r: r["final_price"]),
+    "description": ((Product.description,), lambda r: r["description"]),
+    "imageData": (
+        (Product.image_key, Product.image_data),
+        lambda r: product_image_url(r["image_key"], r["image_data"]),
+    ),
+    "imageKey": ((Product.image_key,), lambda r: r["image_key"] or ""),
+    "thumbnail": (
+        (Product.image_key, Product.image_data),
+        lambda r: product_thumbnail_url(r["image_key"], r["image_data"]),
+    ),
+    "enabled": ((Product.enabled,), lambda r: r["enabled"]),
+    "sizes": ((Product.sizes,), lambda r: r["sizes"] or []),
+    "colors": ((Product.colors,), lambda r: r["colors"] or []),
+    "createdAt": (
+        (Product.created_at,),
+        lambda r: r["created_at"].isoformat() if r["created_at"] else None,
+    ),
+    "updatedAt": (
+        (Product.updated_at,),
+        lambda r: r["updated_at"].isoformat() if r["updated_at"] else None,
+    ),
+}
+
+# Fields of the full ProductResponse shape
+RESPONSE_FIELDS = [name for name in PRODUCT_FIELDS if name != "thumbnail"]
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Rows fetched per round trip when streaming with a server-side cursor
+STREAM_BATCH_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, product_id: str) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a row"""
+    raw = json.dumps([created_at.isoformat(), product_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor from encode_cursor, raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, product_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(product_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated `fields=` value, raises ValueError on unknown names"""
+    if not fields:
+        return list(PRODUCT_FIELDS)
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def select_fields(fields: Sequence[str]):
+    """SELECT of only the columns needed for the given fields (plus the keyset columns)"""
+    columns = {"id": Product.id, "created_at": Product.created_at}
+    for name in fields:
+        for column in PRODUCT_FIELDS[name][0]:
+            columns[column.key] = column
+    return select(*columns.values())
+
+
+def build_fields(row, fields: Sequence[str]) -> Dict:
+    """Build the API dict for a projected row"""
+    return {name: PRODUCT_FIELDS[name][1](row) for name in fields}
+
+
+def bulk_filter(
+    ids: Optional[Sequence[str]] = None,
+    category: Optional[str] = None,
+    all_products: bool = False,
+):
+    """
+    WHERE clause for a bulk operation over exactly one of: an ID list
+    (a single `id = ANY(:ids)` array parameter), a category, or all
+    products. Raises ValueError otherwise.
+    """
+    targets = sum([ids is not None, bool(category), all_products])
+    if targets != 1:
+        raise ValueError("Specify exactly one of ids, category or all")
+    if ids is not None:
+        return Product.id == any_(bindparam("ids", list(ids), type_=ARRAY(String)))
+    if category:
+        return Product.category == category
+    return true()
 
 
 class ProductService:
@@ -43,6 +179,156 @@ class ProductService:
         )
         return list(result.scalars().all())
     
+    @staticmethod
+    async def get_catalog(db: AsyncSession, category: Optional[str] = None) -> List[Dict]:
+        """Cached enabled products (as API dicts), optionally for one category"""
+        cache_key = ("catalog", category)
+        found, items = catalog_cache.get(cache_key)
+        if found:
+            return items
+        
+        if category:
+            products = await ProductService.get_products_by_category(db, category)
+        else:
+            products = await ProductService.get_enabled_products(db)
+        items = [p.to_dict() for p in products]
+        catalog_cache.set(cache_key, items, [category_tag(category)])
+        return items
+    
+    @staticmethod
+    async def get_catalog_product(db: AsyncSession, product_id: str) -> Optional[Dict]:
+        """Cached single product (as API dict)"""
+        cache_key = ("product", product_id)
+        found, item = catalog_cache.get(cache_key)
+        if found:
+            return item
+        
+        product = await ProductService.get_product_by_id(db, product_id)
+        if not product:
+            return None
+        item = product.to_dict()
+        catalog_cache.set(cache_key, item, [product_tag(product_id)])
+        return item
+    
+    @staticmethod
+    async def get_catalog_validator(
+        db: AsyncSession, category: Optional[str] = None
+    ) -> tuple[str, Optional[datetime]]:
+        """
+        Cached (etag, last_modified) for the enabled catalog, from
+        COUNT + MAX(updated_at) rather than the rows themselves.
+        The validator is cached under the same tags as the pages it
+        describes, so a worker's ETag always matches the body it serves.
+        A write only invalidates the writing worker's cache: other workers
+        keep serving (and validating) the old catalog, with their own
+        ETag, for up to catalog_cache_ttl_seconds.
+        Returns: (etag, last_modified)
+        """
+        cache_key = ("validator", category)
+        found, validator = catalog_cache.get(cache_key)
+        if found:
+            return validator
+        
+        query = (
+            select(func.count(Product.id), func.max(Product.updated_at))
+            .where(Product.enabled == True)
+        )
+        if category:
+            query = query.where(Product.category == category)
+        count, last_modified = (await db.execute(query)).one()
+        
+        validator = (make_etag("products", category or "", count, last_modified), last_modified)
+        catalog_cache.set(cache_key, validator, [category_tag(category)])
+        return validator
+    
+    @staticmethod
+    def invalidate_cache(
+        product_id: Optional[str] = None,
+        categories: Sequence[str] = (),
+        product_ids: Sequence[str] = (),
+    ) -> None:
+        """Drop cached reads affected by a write to products in the given categories"""
+        mark_primary_write()
+        tags = [ALL_PRODUCTS_TAG]
+        if product_id:
+            tags.append(product_tag(product_id))
+        tags.extend(product_tag(i) for i in product_ids)
+        tags.extend(category_tag(c) for c in set(categories) if c)
+        catalog_cache.invalidate(*tags)
+    
+    @staticmethod
+    async def get_products_page(
+        db: AsyncSession,
+        fields: Sequence[str],
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> tuple[List[Dict], Optional[str]]:
+        """
+        Get one page of enabled products, newest first, using keyset
+        pagination on (created_at, id). Only the columns needed for the
+        requested fields are selected.
+        Returns: (items, next_cursor)
+        """
+        cache_key = ("page", category, cursor, limit, tuple(fields))
+        found, page = catalog_cache.get(cache_key)
+        if found:
+            return page
+        
+        query = select_fields(fields).where(Product.enabled == True)
+        if category:
+            query = query.where(Product.category == category)
+        if cursor:
+            created_at, product_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Product.created_at, Product.id) < tuple_(
+                    literal(created_at, Product.created_at.type),
+                    literal(product_id, Product.id.type),
+                )
+            )
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(Product.created_at.desc(), Product.id.desc()).limit(limit + 1)
+        
+        rows = (await db.execute(query)).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        items = [build_fields(row, fields) for row in rows]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        
+        catalog_cache.set(cache_key, (items, next_cursor), [category_tag(category)])
+        return items, next_cursor
+    
+    @staticmethod
+    async def stream_products(
+        db: AsyncSession,
+        fields: Sequence[str] = RESPONSE_FIELDS,
+        enabled_only: bool = True,
+        category: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream products newest first through a server-side cursor,
+        yielding one API dict at a time instead of building a full list
+        """
+        query = select_fields(fields)
+        if enabled_only:
+            query = query.where(Product.enabled == True)
+        if category:
+            query = query.where(Product.category == category)
+        query = (
+            query.order_by(Product.created_at.desc(), Product.id.desc())
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        
+        result = await db.stream(query)
+        try:
+            async for row in result.mappings():
+                yield build_fields(row, fields)
+        finally:
+            await result.close()
+    
     @staticmethod
     async def get_product_by_id(db: AsyncSession, product_id: str) -> Optional[Product]:
         """Get single product by ID"""
@@ -69,6 +355,9 @@ class ProductService:
         # Convert colors to dict format
         colors_data = [{"name": c.name, "hex": c.hex} for c in data.colors]
         
+        # Inline base64 images go to the blob store, the row keeps only the key
+        image_key, image_data = await ingest_image_data(image_data)
+        
         product = Product(
             name=data.name,
             category=data.category,
@@ -77,6 +366,7 @@ class ProductService:
             final_price=final_price,
             description=data.description,
             image_data=image_data,
+            image_key=image_key,
             enabled=data.enabled,
             sizes=data.sizes,
             colors=colors_data,
@@ -85,8 +375,69 @@ class ProductService:
         db.add(product)
         await db.commit()
         await db.refresh(product)
+        ProductService.invalidate_cache(product.id, [product.category])
         return product
     
+    @staticmethod
+    async def bulk_create(
+        db: AsyncSession,
+        rows: Sequence[ImportRow],
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> tuple[List[Dict], List[Dict]]:
+        """
+        Insert validated import rows with one multi-row INSERT ... RETURNING
+        per batch, committing each batch. A failed batch is rolled back and
+        reported for each of its rows; earlier batches stay committed.
+        Returns: (created as {"row", "id", "imageKey"}, errors as {"row", "errors"})
+        """
+        created: List[Dict] = []
+        errors: List[Dict] = []
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            values = []
+            try:
+                for _, data, image_data in batch:
+                    image_key, image_data = await ingest_image_data(image_data)
+                    values.append({
+                        "id": str(uuid.uuid4()),
+                        "name": data.name,
+                        "category": data.category,
+                        "price": data.price,
+                        "discount": data.discount,
+                        "final_price": ProductService.calculate_final_price(data.price, data.discount),
+                        "description": data.description,
+                        "image_data": image_data,
+                        "image_key": image_key,
+                        "enabled": data.enabled,
+                        "sizes": data.sizes,
+                        "colors": [{"name": c.name, "hex": c.hex} for c in data.colors],
+                    })
+                result = await db.execute(
+                    insert(Product)
+                    .values(values)
+                    .returning(Product.id, Product.category, Product.image_key)
+                )
+                inserted = result.all()
+                await db.commit()
+            except (SQLAlchemyError, OSError) as e:
+                await db.rollback()
+                # Driver / filesystem messages can leak schema details: log them, report a summary
+                logger.exception("Bulk import batch of %d rows failed: %s", len(batch), e)
+                if isinstance(e, SQLAlchemyError):
+                    message = "Database error inserting batch"
+                else:
+                    message = "Could not store batch images"
+                errors.extend({"row": row_number, "errors": [message]} for row_number, _, _ in batch)
+                continue
+            
+            # IDs are generated here, so rows are matched by ID rather than RETURNING order
+            row_numbers = {v["id"]: row_number for v, (row_number, _, _) in zip(values, batch)}
+            for product_id, _, image_key in inserted:
+                created.append({"row": row_numbers[product_id], "id": product_id, "imageKey": image_key or ""})
+            ProductService.invalidate_cache(categories=[category for _, category, _ in inserted])
+        created.sort(key=lambda item: item["row"])
+        return created, errors
+    
     @staticmethod
     async def update_product(
         db: AsyncSession,
@@ -97,6 +448,7 @@ class ProductService:
         product = await ProductService.get_product_by_id(db, product_id)
         if not product:
             return None
+        old_category = product.category
         
         # Update fields that are provided
         update_data = data.model_dump(exclude_unset=True)
@@ -110,11 +462,17 @@ class ProductService:
         discount = update_data.get("discount", product.discount)
         update_data["final_price"] = ProductService.calculate_final_price(price, discount)
         
+        if "image_data" in update_data:
+            update_data["image_key"], update_data["image_data"] = await ingest_image_data(
+                update_data["image_data"] or ""
+            )
+        
         for key, value in update_data.items():
             setattr(product, key, value)
         
         await db.commit()
         await db.refresh(product)
+        ProductService.invalidate_cache(product_id, [old_category, product.category])
         return product
     
     @staticmethod
@@ -124,18 +482,105 @@ class ProductService:
             update(Product)
             .where(Product.id == product_id)
             .values(enabled=enabled, updated_at=func.now())
+            .returning(Product.category)
+        )
+        category = result.scalar_one_or_none()
+        await db.commit()
+        if category is None:
+            return False
+        ProductService.invalidate_cache(product_id, [category])
+        return True
+    
+    @staticmethod
+    async def set_description(db: AsyncSession, product_id: str, description: str) -> bool:
+        """Replace a product's description (e.g. with AI-generated text)"""
+        result = await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(description=description, updated_at=func.now())
+            .returning(Product.category)
         )
+        category = result.scalar_one_or_none()
         await db.commit()
-        return result.rowcount > 0
+        if category is None:
+            return False
+        ProductService.invalidate_cache(product_id, [category])
+        return True
     
     @staticmethod
     async def delete_product(db: AsyncSession, product_id: str) -> bool:
         """Delete a product"""
         result = await db.execute(
-            delete(Product).where(Product.id == product_id)
+            delete(Product)
+            .where(Product.id == product_id)
+            .returning(Product.category)
         )
+        category = result.scalar_one_or_none()
         await db.commit()
-        return result.rowcount > 0
+        if category is None:
+            return False
+        ProductService.invalidate_cache(product_id, [category])
+        return True
+    
+    @staticmethod
+    async def _bulk_execute(db: AsyncSession, statement) -> List[str]:
+        """Run a bulk UPDATE/DELETE ... RETURNING id, category and invalidate what it touched"""
+        rows = (await db.execute(statement.returning(Product.id, Product.category))).all()
+        await db.commit()
+        if rows:
+            ProductService.invalidate_cache(
+                categories=[category for _, category in rows],
+                product_ids=[product_id for product_id, _ in rows],
+            )
+        return [product_id for product_id, _ in rows]
+    
+    @staticmethod
+    async def bulk_set_enabled(
+        db: AsyncSession,
+        enabled: bool,
+        ids: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+        all_products: bool = False,
+    ) -> List[str]:
+        """Enable or disable many products in one UPDATE; returns the changed IDs"""
+        return await ProductService._bulk_execute(
+            db,
+            update(Product)
+            .where(bulk_filter(ids, category, all_products), Product.enabled != enabled)
+            .values(enabled=enabled, updated_at=func.now()),
+        )
+    
+    @staticmethod
+    async def bulk_set_discount(
+        db: AsyncSession,
+        discount: float,
+        ids: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+        all_products: bool = False,
+    ) -> List[str]:
+        """Set the discount of many products in one UPDATE, recomputing final_price in SQL"""
+        return await ProductService._bulk_execute(
+            db,
+            update(Product)
+            .where(bulk_filter(ids, category, all_products))
+            .values(
+                discount=discount,
+                final_price=Product.price * (1 - discount / 100),
+                updated_at=func.now(),
+            ),
+        )
+    
+    @staticmethod
+    async def bulk_delete(
+        db: AsyncSession,
+        ids: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+        all_products: bool = False,
+    ) -> List[str]:
+        """Delete many products in one DELETE; returns the deleted IDs"""
+        return await ProductService._bulk_execute(
+            db, delete(Product).where(bulk_filter(ids, category, all_products))
+        )
     
     @staticmethod
     async def get_product_stats(db: AsyncSession) -> dict:
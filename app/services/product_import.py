@@ -0,0 +1,149 @@
+"""
+Product Import
+==============
+Parsing and validation for bulk product imports (JSON array, NDJSON or
+CSV). Rows are validated with ProductCreate; valid rows are inserted by
+ProductService.bulk_create in multi-row batches.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.product import ProductCreate
+
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+IMPORT_FORMAT_PATTERN = "^(json|ndjson|csv)$"
+
+# Rows per multi-row INSERT ... RETURNING
+IMPORT_BATCH_SIZE = 200
+
+MAX_IMPORT_ROWS = 5000
+
+# Row keys carrying the image (URL or data URL); not part of ProductCreate
+IMAGE_FIELDS = ("imageData", "image_data")
+
+CONTENT_TYPE_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+EXTENSION_FORMATS = {
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+
+class ImportFormatError(ValueError):
+    """The import body could not be parsed as a whole"""
+
+
+# (row number, validated product, image data). The row number is the
+# source line for NDJSON and CSV and the 1-based array index for JSON.
+ImportRow = Tuple[int, ProductCreate, str]
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    """Import format from a file extension or content type"""
+    if filename:
+        for extension, fmt in EXTENSION_FORMATS.items():
+            if filename.lower().endswith(extension):
+                return fmt
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_FORMATS.get(media_type)
+
+
+def _csv_row(row: Dict[str, str]) -> Dict:
+    """CSV cells are strings: drop empty ones (so defaults apply) and decode list columns"""
+    item = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        key, value = key.strip(), value.strip()
+        if not value:
+            continue
+        if key in ("sizes", "colors") and value.startswith("["):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        elif key == "sizes":
+            value = [s.strip() for s in value.replace("|", ",").split(",") if s.strip()]
+        item[key] = value
+    return item
+
+
+def parse_rows(body: bytes, fmt: str) -> List[Tuple[int, Any]]:
+    """Split an import body into (row number, raw row); raises ImportFormatError"""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise ImportFormatError("Import must be UTF-8") from e
+
+    if fmt == "json":
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"Invalid JSON: {e}") from e
+        if not isinstance(rows, list):
+            raise ImportFormatError("JSON import must be an array of products")
+        rows = list(enumerate(rows, start=1))
+    elif fmt == "ndjson":
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((line_number, json.loads(line)))
+            except json.JSONDecodeError:
+                # Keep the row so it is reported with its position
+                rows.append((line_number, ImportFormatError("Invalid JSON")))
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        # line_num is the (last) source line of the record just read
+        rows = [(reader.line_num, _csv_row(row)) for row in reader]
+    else:
+        raise ImportFormatError(f"Unknown import format: {fmt}")
+
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ImportFormatError(f"Import is limited to {MAX_IMPORT_ROWS} rows")
+    return rows
+
+
+def validate_rows(rows: List[Tuple[int, Any]]) -> Tuple[List[ImportRow], List[Dict]]:
+    """
+    Validate (row number, raw row) pairs from parse_rows with ProductCreate
+    Returns: (valid rows, errors as {"row", "errors"})
+    """
+    valid: List[ImportRow] = []
+    errors: List[Dict] = []
+    for row_number, row in rows:
+        if isinstance(row, Exception):
+            errors.append({"row": row_number, "errors": [str(row)]})
+            continue
+        if not isinstance(row, dict):
+            errors.append({"row": row_number, "errors": ["Row must be an object"]})
+            continue
+        image_data = next((row[key] for key in IMAGE_FIELDS if row.get(key)), "")
+        try:
+            product = ProductCreate(**row)
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "errors": [
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ],
+            })
+            continue
+        valid.append((row_number, product, str(image_data)))
+    return valid, errors
@@ -0,0 +1,221 @@
+"""
+Rate Limiting
+=============
+Token-bucket rate limits keyed by client IP, email or any other string.
+
+Each bucket holds up to `burst` tokens and refills at `per_minute`; a
+request spends one token or is rejected with 429 and a Retry-After.
+
+- memory: per-process buckets in an LRU dict (no I/O at all).
+- database: rate_limit_buckets table shared by all workers, updated with
+  a single atomic upsert per check. Fails open if the database errors.
+
+Scopes listed in rate_limit_memory_scopes always use the memory backend
+(by default the image proxy, where a shared bucket would cost a database
+write per image).
+
+rate_limit() builds a FastAPI dependency for per-IP limits; check_rate_limit() is
+for limits on values only known inside the handler (e.g. login email).
+A limit with per_minute <= 0 is disabled.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import case, delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.models.rate_limit import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+# The database backend drops buckets idle this long (they would be full again)
+BUCKET_IDLE_SECONDS = 3600
+
+# Idle buckets are purged once every this many checks
+PURGE_EVERY_CHECKS = 1000
+
+
+class RateLimiter:
+    """Base class for rate limit backends"""
+
+    async def consume(self, key: str, per_minute: float, burst: int) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryRateLimiter(RateLimiter):
+    """In-process token buckets, least recently used evicted beyond max_keys"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, monotonic time of last refill)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    async def consume(self, key: str, per_minute: float, burst: int) -> float:
+        rate = per_minute / 60
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+            self.allowed += 1
+        else:
+            wait = (1 - tokens) / rate
+            self.rejected += 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "keys": len(self._buckets),
+            "maxKeys": self.max_keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+def _upsert(table):
+    """Dialect-specific INSERT ... ON CONFLICT for the configured database"""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+class DatabaseRateLimiter(RateLimiter):
+    """Token buckets in the rate_limit_buckets table, shared by all workers"""
+
+    def __init__(self, max_keys: int):
+        self._checks = 0
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def consume(self, key: str, per_minute: float, burst: int) -> float:
+        rate = per_minute / 60
+        now = time.time()
+        bucket = RateLimitBucket.__table__
+        # Refill from the stored row, capped at burst, then try to spend a token.
+        # All SET expressions see the old row, so `allowed` and `tokens` agree.
+        refilled = bucket.c.tokens + (now - bucket.c.updated_at) * rate
+        available = case((refilled > burst, float(burst)), else_=refilled)
+        statement = (
+            _upsert(bucket)
+            .values(key=hashlib.sha256(key.encode()).hexdigest(), tokens=burst - 1, updated_at=now, allowed=True)
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[bucket.c.key],
+            set_={
+                "tokens": case((available >= 1, available - 1), else_=available),
+                "updated_at": now,
+                "allowed": available >= 1,
+            },
+        ).returning(bucket.c.tokens, bucket.c.allowed)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                tokens, allowed = (await db.execute(statement)).one()
+                await db.commit()
+                self._checks += 1
+                if self._checks % PURGE_EVERY_CHECKS == 0:
+                    await db.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < now - BUCKET_IDLE_SECONDS))
+                    await db.commit()
+        except SQLAlchemyError as e:
+            # Never lock everyone out because the limiter itself is failing
+            self.errors += 1
+            logger.warning("Rate limit check failed, allowing request: %s", e)
+            return 0.0
+
+        if allowed:
+            self.allowed += 1
+            return 0.0
+        self.rejected += 1
+        return (1 - tokens) / rate
+
+    def stats(self) -> dict:
+        return {
+            "backend": "database",
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+RATE_LIMITERS: Dict[str, Type[RateLimiter]] = {
+    "memory": MemoryRateLimiter,
+    "database": DatabaseRateLimiter,
+}
+
+
+@lru_cache()
+def get_rate_limiter(backend_name: Optional[str] = None) -> RateLimiter:
+    """Get a rate limit backend (the configured one by default)"""
+    backend_name = backend_name or settings.rate_limit_backend
+    backend = RATE_LIMITERS.get(backend_name)
+    if backend is None:
+        raise ValueError(f"Unknown rate limit backend: {backend_name}")
+    return backend(settings.rate_limit_max_keys)
+
+
+@lru_cache()
+def memory_scopes() -> FrozenSet[str]:
+    return frozenset(scope.strip() for scope in settings.rate_limit_memory_scopes.split(",") if scope.strip())
+
+
+def limiter_for(scope: str) -> RateLimiter:
+    """Backend for a scope: memory for rate_limit_memory_scopes, else the configured one"""
+    if scope in memory_scopes():
+        return get_rate_limiter("memory")
+    return get_rate_limiter()
+
+
+def client_ip(request: Request) -> str:
+    """
+    Client address; with trusted_proxy_count > 0, taken from the hop that
+    many entries from the end of X-Forwarded-For (the part our proxies
+    appended, which the client cannot spoof)
+    """
+    if settings.trusted_proxy_count > 0:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= settings.trusted_proxy_count:
+            return hops[-settings.trusted_proxy_count]
+    return request.client.host if request.client else "unknown"
+
+
+async def check_rate_limit(scope: str, identity: str, per_minute: float, burst: int) -> None:
+    """Spend a token from the (scope, identity) bucket or raise 429"""
+    if per_minute <= 0:
+        return
+    wait = await limiter_for(scope).consume(f"{scope}:{identity}", per_minute, max(1, burst))
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+
+def rate_limit(scope: str, per_minute: float, burst: int):
+    """Dependency limiting requests to an endpoint group per client IP"""
+    async def dependency(request: Request) -> None:
+        await check_rate_limit(scope, client_ip(request), per_minute, burst)
+    return dependency
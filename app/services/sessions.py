@@ -0,0 +1,485 @@
+"""
+Session Store
+=============
+Pluggable storage for admin login sessions.
+
+- memory: per-process dict with a TTL heap; expired sessions are swept
+  on every write and the soonest-expiring are evicted beyond
+  session_max_sessions. Only suitable for a single worker.
+- database: admin_sessions table shared by all workers (tokens stored
+  as SHA-256 hashes), fronted by a short-lived in-process lookup cache
+  so validating a token is usually a dict lookup. Logout and
+  update_admin() clear only this worker's cache: other workers may
+  accept the old session for up to session_cache_seconds.
+- signed: self-contained HMAC-SHA256 tokens any worker can verify with
+  only SESSION_SECRET_KEY. Logout revokes the token ID in a small
+  revocation list, shared through the revoked_tokens table and pulled
+  by each worker at most once per session_cache_seconds. Admin changes
+  are shared the same way (signed_admin_updates) and replace the
+  snapshot signed into tokens issued before the change.
+
+Sessions also carry an AdminSnapshot (display name, is_admin) taken at
+login, so authorizing a request or answering /api/auth/me needs no
+admin query. update_admin() refreshes it in the admin's live sessions.
+"""
+
+import asyncio
+import base64
+import hashlib
+import heapq
+import hmac
+import json
+import logging
+import secrets
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.session import AdminSession, RevokedToken, SignedAdminUpdate
+
+logger = logging.getLogger(__name__)
+
+# Expired rows are purged once every this many writes (logins / logouts)
+PURGE_EVERY_WRITES = 100
+
+# Revocation syncs re-read this much history to tolerate clock skew between workers
+REVOCATION_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+SIGNED_KEY_MISSING = (
+    "SESSION_SECRET_KEY must be set for SESSION_BACKEND=signed: a per-process "
+    "key would reject tokens issued by other workers or before a restart"
+)
+
+# Fail at startup, not on the first login
+if settings.session_backend == "signed" and not settings.session_secret_key:
+    raise ValueError(SIGNED_KEY_MISSING)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    """SQLite drops tzinfo; treat naive timestamps as UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class AdminSnapshot(NamedTuple):
+    """Immutable copy of the admin fields requests need"""
+    display_name: str
+    is_admin: bool
+
+
+class SessionStore:
+    """
+    Base class for session backends. Sessions are dicts with admin_id,
+    email, admin (AdminSnapshot), created_at and expires_at.
+    """
+
+    async def issue(self, session: dict) -> str:
+        """Store a new session and return its bearer token"""
+        token = secrets.token_urlsafe(32)
+        await self.create(token, session)
+        return token
+
+    async def create(self, token: str, session: dict) -> None:
+        raise NotImplementedError
+
+    async def get(self, token: str) -> Optional[dict]:
+        """Get a live session, or None if missing or expired"""
+        raise NotImplementedError
+
+    async def delete(self, token: str) -> bool:
+        raise NotImplementedError
+
+    async def update_admin(self, admin_id: str, admin: AdminSnapshot) -> None:
+        """Replace the admin snapshot in every live session of this admin"""
+        raise NotImplementedError
+
+    async def admin_outdated(self, admin_id: str, admin: AdminSnapshot) -> bool:
+        """True if a live session of this admin may hold a different snapshot (read only)"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions with TTL heap eviction and a size bound"""
+
+    def __init__(self, max_sessions: Optional[int]):
+        # None = unbounded (entries only leave once they expire)
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, dict] = {}
+        # (expires_at timestamp, token); stale entries are skipped lazily
+        self._expiry: List[Tuple[float, str]] = []
+        self.evictions = 0
+
+    def _is_current(self, expires_at: float, token: str) -> bool:
+        session = self._sessions.get(token)
+        return session is not None and session["expires_at"].timestamp() == expires_at
+
+    def _sweep(self) -> None:
+        now = _now().timestamp()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, token = heapq.heappop(self._expiry)
+            if self._is_current(expires_at, token):
+                del self._sessions[token]
+        while self.max_sessions is not None and len(self._sessions) > self.max_sessions and self._expiry:
+            # Over capacity: drop the sessions closest to expiry first
+            expires_at, token = heapq.heappop(self._expiry)
+            if self._is_current(expires_at, token):
+                del self._sessions[token]
+                self.evictions += 1
+        if len(self._expiry) > 2 * len(self._sessions) + 64:
+            # Too many stale heap entries (logouts, refreshes): rebuild
+            self._expiry = [(s["expires_at"].timestamp(), t) for t, s in self._sessions.items()]
+            heapq.heapify(self._expiry)
+
+    def put(self, token: str, session: dict) -> None:
+        self._sessions[token] = session
+        heapq.heappush(self._expiry, (session["expires_at"].timestamp(), token))
+        self._sweep()
+
+    def lookup(self, token: str) -> Optional[dict]:
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        if _now() >= session["expires_at"]:
+            del self._sessions[token]
+            return None
+        return session
+
+    def remove(self, token: str) -> bool:
+        return self._sessions.pop(token, None) is not None
+
+    def remove_where(self, predicate: Callable[[dict], bool]) -> int:
+        tokens = [token for token, session in self._sessions.items() if predicate(session)]
+        for token in tokens:
+            del self._sessions[token]
+        return len(tokens)
+
+    async def create(self, token: str, session: dict) -> None:
+        self.put(token, session)
+
+    async def get(self, token: str) -> Optional[dict]:
+        return self.lookup(token)
+
+    async def delete(self, token: str) -> bool:
+        return self.remove(token)
+
+    async def update_admin(self, admin_id: str, admin: AdminSnapshot) -> None:
+        for token, session in self._sessions.items():
+            if session["admin_id"] == admin_id and session["admin"] != admin:
+                # Same expiry, so the heap entry stays valid
+                self._sessions[token] = {**session, "admin": admin}
+
+    async def admin_outdated(self, admin_id: str, admin: AdminSnapshot) -> bool:
+        return any(
+            session["admin_id"] == admin_id and session["admin"] != admin
+            for session in self._sessions.values()
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "maxSessions": self.max_sessions,
+            "evictions": self.evictions,
+        }
+
+
+class DatabaseSessionStore(SessionStore):
+    """Sessions in the admin_sessions table with a per-process lookup cache"""
+
+    def __init__(self, max_sessions: int):
+        # Cached entries expire after session_cache_seconds (or the session, if sooner)
+        self._cache = MemorySessionStore(max_sessions)
+        self._creates = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _cache_put(self, token: str, session: dict) -> None:
+        cache_until = datetime.fromtimestamp(
+            min(session["expires_at"].timestamp(), _now().timestamp() + settings.session_cache_seconds),
+            timezone.utc,
+        )
+        self._cache.put(token, {"session": session, "expires_at": cache_until})
+
+    async def create(self, token: str, session: dict) -> None:
+        async with AsyncSessionLocal() as db:
+            db.add(AdminSession(
+                token_hash=self.token_hash(token),
+                admin_id=session["admin_id"],
+                email=session["email"],
+                display_name=session["admin"].display_name,
+                is_admin=session["admin"].is_admin,
+                expires_at=session["expires_at"],
+            ))
+            await db.commit()
+            self._creates += 1
+            if self._creates % PURGE_EVERY_WRITES == 0:
+                await db.execute(delete(AdminSession).where(AdminSession.expires_at <= _now()))
+                await db.commit()
+        self._cache_put(token, session)
+
+    async def get(self, token: str) -> Optional[dict]:
+        cached = self._cache.lookup(token)
+        if cached is not None:
+            session = cached["session"]
+            if _now() < session["expires_at"]:
+                self.hits += 1
+                return session
+            return None
+
+        self.misses += 1
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(AdminSession).where(AdminSession.token_hash == self.token_hash(token))
+            )
+            row = result.scalar_one_or_none()
+        if row is None or _now() >= _aware(row.expires_at):
+            return None
+        session = {
+            "admin_id": row.admin_id,
+            "email": row.email,
+            "admin": AdminSnapshot(display_name=row.display_name or "", is_admin=bool(row.is_admin)),
+            "created_at": _aware(row.created_at) if row.created_at else None,
+            "expires_at": _aware(row.expires_at),
+        }
+        self._cache_put(token, session)
+        return session
+
+    async def delete(self, token: str) -> bool:
+        # Other workers' cached copies expire within session_cache_seconds
+        self._cache.remove(token)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(AdminSession).where(AdminSession.token_hash == self.token_hash(token))
+            )
+            await db.commit()
+        return bool(result.rowcount)
+
+    async def update_admin(self, admin_id: str, admin: AdminSnapshot) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(AdminSession)
+                .where(AdminSession.admin_id == admin_id, AdminSession.expires_at > _now())
+                .values(display_name=admin.display_name, is_admin=admin.is_admin)
+            )
+            await db.commit()
+        # Other workers pick the change up when their cached entry expires
+        self._cache.remove_where(lambda cached: cached["session"]["admin_id"] == admin_id)
+
+    async def admin_outdated(self, admin_id: str, admin: AdminSnapshot) -> bool:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(AdminSession.token_hash)
+                .where(
+                    AdminSession.admin_id == admin_id,
+                    AdminSession.expires_at > _now(),
+                    (AdminSession.display_name != admin.display_name) | (AdminSession.is_admin != admin.is_admin),
+                )
+                .limit(1)
+            )
+            return result.first() is not None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "database",
+            "cachedSessions": len(self._cache),
+            "cacheSeconds": settings.session_cache_seconds,
+            "cacheHits": self.hits,
+            "cacheMisses": self.misses,
+        }
+
+
+class SignedTokenStore(SessionStore):
+    """Stateless HMAC-signed tokens with a revocation list for logout"""
+
+    def __init__(self, max_sessions: int):
+        if not settings.session_secret_key:
+            raise ValueError(SIGNED_KEY_MISSING)
+        self._key = settings.session_secret_key.encode()
+        # Revoked token IDs, each dropped once the token would have expired anyway.
+        # Never capped: evicting an entry early would make a logged-out token valid again.
+        self._revoked = MemorySessionStore(None)
+        self._revocations = 0
+        self._synced_until: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._sync_lock = asyncio.Lock()
+        # admin_id -> (snapshot, time of change) for tokens issued before the change,
+        # mirrored from signed_admin_updates
+        self._admin_updates: Dict[str, Tuple[AdminSnapshot, datetime]] = {}
+
+    def _sign(self, body: str) -> str:
+        return _b64encode(hmac.new(self._key, body.encode(), hashlib.sha256).digest())
+
+    async def issue(self, session: dict) -> str:
+        claims = {
+            "sub": session["admin_id"],
+            "email": session["email"],
+            "name": session["admin"].display_name,
+            "adm": session["admin"].is_admin,
+            "iat": int(session["created_at"].timestamp()),
+            "exp": int(session["expires_at"].timestamp()),
+            "jti": secrets.token_hex(16),
+        }
+        body = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{body}.{self._sign(body)}"
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Check signature and expiry (not revocation) and decode the session"""
+        body, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature.encode(), self._sign(body).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(body))
+            session = {
+                "admin_id": claims["sub"],
+                "email": claims["email"],
+                "admin": AdminSnapshot(display_name=claims["name"], is_admin=bool(claims["adm"])),
+                "created_at": datetime.fromtimestamp(claims["iat"], timezone.utc),
+                "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc),
+                "jti": claims["jti"],
+            }
+        except (ValueError, KeyError, TypeError, OverflowError):
+            return None
+        if _now() >= session["expires_at"]:
+            return None
+        return session
+
+    async def _sync_revocations(self) -> None:
+        """Pull logouts and admin changes made by other workers, at most once per session_cache_seconds"""
+        loop = asyncio.get_running_loop()
+        if loop.time() - self._checked_at < settings.session_cache_seconds:
+            return
+        async with self._sync_lock:
+            if loop.time() - self._checked_at < settings.session_cache_seconds:
+                return
+            self._checked_at = loop.time()
+            started = _now()
+            query = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > started)
+            updates_query = select(SignedAdminUpdate)
+            if self._synced_until is not None:
+                query = query.where(RevokedToken.revoked_at >= self._synced_until - REVOCATION_SYNC_OVERLAP)
+                updates_query = updates_query.where(
+                    SignedAdminUpdate.updated_at >= self._synced_until - REVOCATION_SYNC_OVERLAP
+                )
+            try:
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(query)).all()
+                    updates = (await db.execute(updates_query)).scalars().all()
+            except SQLAlchemyError as e:
+                # Keep verifying against the local list; retry after the next interval
+                logger.warning("Revocation list sync failed: %s", e)
+                return
+            for jti, expires_at in rows:
+                self._revoked.put(jti, {"expires_at": _aware(expires_at)})
+            for row in updates:
+                updated_at = _aware(row.updated_at)
+                known = self._admin_updates.get(row.admin_id)
+                if known is None or known[1] < updated_at:
+                    snapshot = AdminSnapshot(display_name=row.display_name or "", is_admin=bool(row.is_admin))
+                    self._admin_updates[row.admin_id] = (snapshot, updated_at)
+            self._synced_until = started
+
+    async def get(self, token: str) -> Optional[dict]:
+        session = self.verify(token)
+        if session is None:
+            return None
+        await self._sync_revocations()
+        if self._revoked.lookup(session["jti"]) is not None:
+            return None
+        changed = self._admin_updates.get(session["admin_id"])
+        if changed is not None and session["created_at"] <= changed[1]:
+            session["admin"] = changed[0]
+        return session
+
+    async def delete(self, token: str) -> bool:
+        session = self.verify(token)
+        if session is None or self._revoked.lookup(session["jti"]) is not None:
+            return False
+        self._revoked.put(session["jti"], {"expires_at": session["expires_at"]})
+        async with AsyncSessionLocal() as db:
+            db.add(RevokedToken(jti=session["jti"], revoked_at=_now(), expires_at=session["expires_at"]))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Already revoked by another worker
+                await db.rollback()
+            self._revocations += 1
+            if self._revocations % PURGE_EVERY_WRITES == 0:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= _now()))
+                await db.commit()
+        return True
+
+    async def update_admin(self, admin_id: str, admin: AdminSnapshot) -> None:
+        # The snapshot is signed into each token: override it for tokens issued
+        # before now, here at once and in other workers at their next sync
+        changed = _now()
+        self._admin_updates[admin_id] = (admin, changed)
+        row = SignedAdminUpdate(
+            admin_id=admin_id, display_name=admin.display_name, is_admin=admin.is_admin, updated_at=changed
+        )
+        async with AsyncSessionLocal() as db:
+            await db.merge(row)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker inserted the row first: update it instead
+                await db.rollback()
+                await db.merge(row)
+                await db.commit()
+
+    async def admin_outdated(self, admin_id: str, admin: AdminSnapshot) -> bool:
+        # Tokens carry the snapshot from their login, which the store never sees:
+        # only a recorded update (ours or synced) says what they currently resolve to
+        await self._sync_revocations()
+        changed = self._admin_updates.get(admin_id)
+        return changed is None or changed[0] != admin
+
+    def stats(self) -> dict:
+        return {
+            "backend": "signed",
+            "revokedTokens": len(self._revoked),
+            "adminUpdates": len(self._admin_updates),
+            "revocationsSyncedUntil": self._synced_until.isoformat() if self._synced_until else None,
+        }
+
+
+SESSION_STORES: Dict[str, Type[SessionStore]] = {
+    "memory": MemorySessionStore,
+    "database": DatabaseSessionStore,
+    "signed": SignedTokenStore,
+}
+
+
+@lru_cache()
+def get_session_store() -> SessionStore:
+    """Get the configured session backend"""
+    backend = SESSION_STORES.get(settings.session_backend)
+    if backend is None:
+        raise ValueError(f"Unknown session backend: {settings.session_backend}")
+    return backend(settings.session_max_sessions)
@@ -8,6 +8,7 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.database import mark_primary_write
 from app.models.settings import SiteSettings
 from app.schemas.settings import SettingsUpdate
 
@@ -15,11 +16,16 @@ from app.schemas.settings import SettingsUpdate
 class SettingsService:
     """Settings service for site configuration"""
     
+    @staticmethod
+    async def find_settings(db: AsyncSession) -> Optional[SiteSettings]:
+        """Get site settings without creating them (safe on a read replica)"""
+        result = await db.execute(select(SiteSettings).where(SiteSettings.id == 1))
+        return result.scalar_one_or_none()
+    
     @staticmethod
     async def get_settings(db: AsyncSession) -> SiteSettings:
         """Get site settings, creating default if not exists"""
-        result = await db.execute(select(SiteSettings).where(SiteSettings.id == 1))
-        settings = result.scalar_one_or_none()
+        settings = await SettingsService.find_settings(db)
         
         if not settings:
             # Create default settings
@@ -33,6 +39,7 @@ class SettingsService:
             )
             db.add(settings)
             await db.commit()
+            mark_primary_write()
             await db.refresh(settings)
         
         return settings
@@ -58,5 +65,6 @@ class SettingsService:
                 setattr(settings, snake_key, update_data[camel_key])
         
         await db.commit()
+        mark_primary_write()
         await db.refresh(settings)
         return settings
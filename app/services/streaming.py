@@ -0,0 +1,81 @@
+"""
+Streaming Responses
+===================
+Incremental JSON / NDJSON encoding for large listings.
+Items are encoded one at a time and flushed in small chunks, so peak
+memory stays flat regardless of how many rows are streamed.
+Also Server-Sent Events for relaying incremental results (e.g. LLM tokens).
+"""
+
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+
+
+STREAM_FORMATS = ("json", "ndjson")
+
+# Flush to the client once this many bytes are buffered
+CHUNK_SIZE = 64 * 1024
+
+
+def _encode(item: Any) -> str:
+    return json.dumps(item, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+async def iter_json_array(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Encode items as one JSON array, element by element"""
+    buffer = ["["]
+    size = 1
+    first = True
+    async for item in items:
+        encoded = _encode(item) if first else "," + _encode(item)
+        first = False
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    buffer.append("]")
+    yield "".join(buffer).encode()
+
+
+async def iter_ndjson(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Encode items as newline-delimited JSON"""
+    buffer = []
+    size = 0
+    async for item in items:
+        encoded = _encode(item) + "\n"
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def json_stream_response(items: AsyncIterator[Any], fmt: str = "json") -> StreamingResponse:
+    """Wrap an async iterator of JSON-able items in a streaming response"""
+    if fmt == "ndjson":
+        return StreamingResponse(iter_ndjson(items), media_type="application/x-ndjson")
+    return StreamingResponse(iter_json_array(items), media_type="application/json")
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {_encode(data)}\n\n".encode()
+
+
+async def iter_sse(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[bytes]:
+    async for event, data in events:
+        yield sse_event(event, data)
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Stream (event, data) pairs as text/event-stream, unbuffered by proxies"""
+    return StreamingResponse(
+        iter_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
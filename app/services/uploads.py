@@ -0,0 +1,102 @@
+"""
+Upload Pipeline
+===============
+Chunked handling of image uploads: Starlette already spools each upload
+to a temporary file, which is hashed and size-checked in place (never
+copied again), so the request holds no extra copies. Encoding work happens off the event loop and
+only when a consumer actually needs it (see ImageVariantService.encode_for_vision).
+"""
+
+import asyncio
+import hashlib
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.services.image_store import sniff_content_type
+
+
+CHUNK_SIZE = 256 * 1024
+
+# Only these prefixes carry image uploads; other bodies are left alone
+UPLOAD_PATH_PREFIXES = ("/api/ai-products",)
+
+
+class UploadTooLarge(Exception):
+    """Upload exceeded max_upload_bytes"""
+
+
+class SpooledUpload:
+    """An upload's spooled file, with its size, SHA-256 and sniffed type"""
+
+    def __init__(self, file: BinaryIO, size: int, sha256: str, content_type: str):
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    async def read_bytes(self) -> bytes:
+        return await asyncio.to_thread(self._read)
+
+    def _read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+
+async def spool_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """Hash and size-check an upload's spooled file in chunks, then rewind it"""
+    max_bytes = max_bytes or settings.max_upload_bytes
+    # Starlette knows the size once the form is parsed: reject before reading anything
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        if not head:
+            head = chunk[:32]
+        hasher.update(chunk)
+    await upload.seek(0)
+
+    content_type = sniff_content_type(head)
+    if content_type == "application/octet-stream":
+        content_type = upload.content_type or content_type
+    return SpooledUpload(upload.file, size, hasher.hexdigest(), content_type)
+
+
+class UploadLimitMiddleware:
+    """
+    Reject uploads whose declared Content-Length exceeds the limit before
+    the multipart body is read. Bodies without Content-Length are still
+    bounded by spool_upload.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        # Room for multipart boundaries and the other form fields
+        self.max_bytes = max_bytes + 64 * 1024
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(UPLOAD_PATH_PREFIXES):
+            for name, value in scope.get("headers", []):
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                    await send({
+                        "type": "http.response.start",
+                        "status": 413,
+                        "headers": [(b"content-type", b"application/json")],
+                    })
+                    await send({
+                        "type": "http.response.body",
+                        "body": b'{"detail":"Upload too large"}',
+                    })
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,99 @@
+"""
+Password Hash Calibration
+=========================
+Finds the password hash cost whose verify time on this machine is
+closest to a target, and prints the settings to put in .env.
+
+Run it on the production hardware: a verify holds one of the
+PASSWORD_HASH_WORKERS threads for its whole duration, so login
+throughput per process is about workers / verify time.
+
+Usage:
+    python calibrate_password_hash.py [--target-ms 250] [--algorithm scrypt|pbkdf2_sha256]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Tuple
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.config import settings
+from app.services.passwords import PASSWORD_ALGORITHMS, hash_password, verify_password
+
+ROUNDS = 3
+
+
+def time_verify(**cost) -> float:
+    """Best-of-ROUNDS verify time in seconds for the given cost"""
+    password_hash = hash_password("calibration-password", **cost)
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        verify_password("calibration-password", password_hash)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_scrypt(target: float) -> Tuple[dict, float]:
+    """Double n (memory and time) until the verify time passes the target"""
+    r, p = settings.password_scrypt_r, settings.password_scrypt_p
+    n = 2 ** 10
+    best = None
+    while n <= 2 ** 20:
+        elapsed = time_verify(algorithm="scrypt", scrypt_n=n, scrypt_r=r, scrypt_p=p)
+        print(f"  n=2^{n.bit_length() - 1:<3} {elapsed * 1000:8.1f} ms  ({128 * r * n // (1024 * 1024)} MB)")
+        if best is None or abs(elapsed - target) < abs(best[1] - target):
+            best = (n, elapsed)
+        if elapsed >= target:
+            break
+        n *= 2
+    n, elapsed = best
+    return {
+        "PASSWORD_HASH_ALGORITHM": "scrypt",
+        "PASSWORD_SCRYPT_N": n,
+        "PASSWORD_SCRYPT_R": r,
+        "PASSWORD_SCRYPT_P": p,
+    }, elapsed
+
+
+def calibrate_pbkdf2(target: float) -> Tuple[dict, float]:
+    """PBKDF2 time is linear in iterations: measure once and scale"""
+    probe = 100000
+    elapsed = time_verify(algorithm="pbkdf2_sha256", pbkdf2_iterations=probe)
+    iterations = max(10000, int(probe * target / elapsed) // 10000 * 10000)
+    elapsed = time_verify(algorithm="pbkdf2_sha256", pbkdf2_iterations=iterations)
+    print(f"  iterations={iterations} {elapsed * 1000:8.1f} ms")
+    return {
+        "PASSWORD_HASH_ALGORITHM": "pbkdf2_sha256",
+        "PASSWORD_PBKDF2_ITERATIONS": iterations,
+    }, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate password hash cost")
+    parser.add_argument("--target-ms", type=float, default=250, help="Target verify time (default 250)")
+    parser.add_argument("--algorithm", choices=PASSWORD_ALGORITHMS, default=settings.password_hash_algorithm)
+    args = parser.parse_args()
+
+    target = args.target_ms / 1000
+    print(f"Calibrating {args.algorithm} for ~{args.target_ms:.0f} ms per verify...")
+    if args.algorithm == "scrypt":
+        env, elapsed = calibrate_scrypt(target)
+    else:
+        env, elapsed = calibrate_pbkdf2(target)
+
+    workers = max(1, settings.password_hash_workers)
+    print()
+    print(f"✅ {elapsed * 1000:.1f} ms per verify, ~{workers / elapsed:.1f} logins/s per process "
+          f"with PASSWORD_HASH_WORKERS={workers}")
+    print()
+    for key, value in env.items():
+        print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
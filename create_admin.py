@@ -1,7 +1,9 @@
 """
 Create Admin User Script
 =========================
-Interactive script to create additional admin users
+Interactive script to create, list and update admin users
+(role and name changes reach live sessions with the database or
+signed session backends)
 
 Usage:
     python create_admin.py
@@ -113,6 +115,39 @@ async def list_admins():
         print(f"❌ Error listing admins: {str(e)}")
 
 
+async def update_admin_user():
+    """Change an admin's display name or access; applied to their live sessions"""
+    print("=" * 60)
+    print("UPDATE ADMIN USER".center(60))
+    print("=" * 60)
+    print()
+    
+    email = input("Enter admin email: ").strip()
+    
+    try:
+        await init_db()
+        
+        async with AsyncSessionLocal() as db:
+            admin = await AuthService.get_admin_by_email(db, email)
+            if not admin:
+                print(f"❌ No admin with email '{email}'!")
+                return
+            
+            display_name = input(f"Display name [{admin.display_name}]: ").strip() or None
+            access = input(f"Admin access (y/n) [{'y' if admin.is_admin else 'n'}]: ").strip().lower()
+            is_admin = {"y": True, "n": False}.get(access)
+            
+            admin = await AuthService.update_admin(db, admin, display_name=display_name, is_admin=is_admin)
+            
+            print()
+            print("✅ Admin user updated!")
+            print(f"Display Name: {admin.display_name}")
+            print(f"Admin Access: {'yes' if admin.is_admin else 'no'}")
+            
+    except Exception as e:
+        print(f"❌ Error updating admin: {str(e)}")
+
+
 async def main():
     """Main menu"""
     while True:
@@ -123,16 +158,19 @@ async def main():
         print()
         print("1. Create new admin user")
         print("2. List existing admins")
-        print("3. Exit")
+        print("3. Change an admin's name or access")
+        print("4. Exit")
         print()
         
-        choice = input("Select option (1-3): ").strip()
+        choice = input("Select option (1-4): ").strip()
         
         if choice == "1":
             await create_admin_user()
         elif choice == "2":
             await list_admins()
         elif choice == "3":
+            await update_admin_user()
+        elif choice == "4":
             print("Goodbye!")
             break
         else:
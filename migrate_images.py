@@ -0,0 +1,84 @@
+"""
+Image Migration Script
+======================
+Moves inline base64 product images (products.image_data) into the
+content-addressed image store and leaves only the key on the row.
+
+Safe to re-run: already migrated rows are skipped.
+
+Usage:
+    python migrate_images.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select, update, text
+
+from app.database import engine, AsyncSessionLocal
+from app.models.product import Product
+from app.services.image_store import ingest_image_data
+
+BATCH_SIZE = 20
+
+
+async def add_image_key_column():
+    """Add products.image_key to databases created before the image store"""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "ALTER TABLE products ADD COLUMN IF NOT EXISTS image_key VARCHAR(64) DEFAULT ''"
+        ))
+    print("✅ products.image_key column ready")
+
+
+async def migrate_images():
+    """Move data URLs into the image store in small batches"""
+    migrated = 0
+    failed = set()
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            # Only load id + image_data, a few rows at a time, to bound memory
+            query = (
+                select(Product.id, Product.image_data)
+                .where(Product.image_data.like("data:%"))
+                .order_by(Product.id)
+                .limit(BATCH_SIZE)
+            )
+            if failed:
+                query = query.where(Product.id.not_in(failed))
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+
+            for product_id, image_data in rows:
+                image_key, remaining = await ingest_image_data(image_data)
+                if not image_key:
+                    print(f"⚠️  Could not decode image for product {product_id}")
+                    failed.add(product_id)
+                    continue
+                await db.execute(
+                    update(Product)
+                    .where(Product.id == product_id)
+                    .values(image_key=image_key, image_data=remaining)
+                )
+                migrated += 1
+
+            await db.commit()
+            print(f"🔄 Migrated {migrated} images...")
+
+    print(f"✅ Done: {migrated} images moved to the image store, {len(failed)} skipped")
+
+
+async def main():
+    await add_image_key_column()
+    await migrate_images()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())